@@ -5,7 +5,7 @@ import plotly.express as px
 import streamlit as st
 
 from utils.auth import require_auth, get_current_user
-from utils import api
+from job_client import run_job
 
 # 🔐 Auth guard
 require_auth()
@@ -128,8 +128,7 @@ if clear:
     st.rerun()
 
 if run and code_in.strip():
-    with st.spinner("Optimizing…"):
-        result = api.api_client.optimize(code_in)
+    result = run_job(code_in, "hybrid", "Optimizing…")
 
     status = result.get("status", "ERROR")
     metrics = result.get("benchmarks", {}) or {}
@@ -143,8 +142,7 @@ if run and code_in.strip():
         )
 
 elif bench and code_in.strip():
-    with st.spinner("Benchmarking…"):
-        result = api.api_client.optimize_rules_only(code_in)
+    result = run_job(code_in, "rules_only", "Benchmarking…")
 
     status = result.get("status", "ERROR")
     metrics = result.get("benchmarks", {}) or {}
@@ -188,6 +186,21 @@ with m3:
         unsafe_allow_html=True
     )
 
+# ------------------ Memory & GC ------------------
+if orig.get("peak_bytes_per_call") is not None:
+    st.markdown("### Memory & GC Pressure")
+    memory_rows = []
+    for label, version in (("Before", orig), ("After", opt or {})):
+        gc_stats = version.get("gc") or {}
+        memory_rows.append({
+            "Version": label,
+            "Peak KB / call": round((version.get("peak_bytes_per_call") or 0) / 1024, 2),
+            "Net blocks / call": version.get("net_blocks_per_call"),
+            "GC collections / 1k iter": gc_stats.get("collections_per_1k_iter"),
+            "GC time %": gc_stats.get("gc_time_pct")
+        })
+    st.dataframe(pd.DataFrame(memory_rows), hide_index=True, use_container_width=True)
+
 # ------------------ Charts ------------------
 st.markdown("### Runtime Comparison & Memory Usage")
 
@@ -234,7 +247,20 @@ if result and result.get("confidence"):
 if result and result.get("rules_detected"):
     st.markdown("### 🔍 Optimizations Applied")
     for r in result["rules_detected"]:
-        st.markdown(f"- **{r['message']}** → {r['suggestion']}")
+        cost = f" · {r['measured_time_pct']}% of runtime" if "measured_time_pct" in r else ""
+        st.markdown(f"- **{r['message']}** → {r['suggestion']}{cost}")
+
+# ------------------ Hotspots ------------------
+if result and (result.get("hotspots") or {}).get("hotspots"):
+    st.markdown("### 🔥 Hot Lines")
+    profile = result["hotspots"]
+    st.caption(f"Profiled with {profile['method']} · {profile['total_ms']} ms total · "
+               "retained_kb: memory still held at the end of the run, by allocating line")
+    st.dataframe(
+        pd.DataFrame(profile["hotspots"])[["line", "source", "time_ms", "time_pct", "hits", "retained_kb"]],
+        use_container_width=True,
+        hide_index=True
+    )
 
 # ------------------ History ------------------
 if status == "SUCCESS" and code_in.strip():
@@ -150,6 +150,60 @@ with tab1:
     </div>
     """, unsafe_allow_html=True)
 
+    # Batch
+    st.markdown("""
+    <div class='endpoint-card'>
+        <span class='method-badge method-post'>POST</span>
+        <strong>/optimize/batch</strong> · <strong>/optimize-rules-only/batch</strong>
+        <p>📚 Optimize up to 500 snippets in one request</p>
+        <p><strong>Body:</strong> <code>{"items": [{"id": "a.py", "code": "..."}], "concurrency": 4}</code></p>
+        <p><strong>Response:</strong> NDJSON, one line per item as it finishes, then a summary line</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Async Jobs
+    st.markdown("""
+    <div class='endpoint-card'>
+        <span class='method-badge method-post'>POST</span>
+        <strong>/jobs</strong>
+        <p>⏳ Queue an optimization and return a job ID immediately (202)</p>
+        <p><strong>Body:</strong> same as /optimize plus <code>mode</code>: "hybrid" or "rules_only"</p>
+        <p><strong>GET /jobs/{id}:</strong> status, completed stages and partial results</p>
+        <p><strong>GET /jobs/{id}/events:</strong> server-sent events, one per pipeline stage, then the result</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Admission control
+    st.markdown("""
+    <div class='endpoint-card'>
+        <strong>Rate limits & queueing</strong>
+        <p>🚦 Optimize, upload, batch and job endpoints pass through admission control</p>
+        <p><strong>Headers:</strong> <code>Authorization: Bearer &lt;token&gt;</code>, signed with <code>IDENTITY_SECRET</code>, identifies the logged-in user (per-user token buckets). The admin role (queued first) also needs <code>X-Admin-Token</code> matching <code>ADMIN_TOKEN</code>. Without a valid token, limits apply per client address.</p>
+        <p><strong>429 Too Many Requests:</strong> rate limit exceeded or queue full; retry after the <code>Retry-After</code> header (seconds)</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Metrics
+    st.markdown("""
+    <div class='endpoint-card'>
+        <span class='method-badge method-get'>GET</span>
+        <strong>/metrics</strong>
+        <p>📈 Prometheus text format: per-stage latency histograms, request and cache counters, queue depths</p>
+        <p><strong>GET /metrics/summary:</strong> the same figures as JSON (used by the admin Analytics tab)</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Traces
+    st.markdown("""
+    <div class='endpoint-card'>
+        <span class='method-badge method-get'>GET</span>
+        <strong>/admin/traces</strong> · <strong>/admin/traces/{trace_id}</strong>
+        <p>🔍 Recent request traces with nested spans per stage, LLM call and benchmark run</p>
+        <p><strong>Query:</strong> <code>limit</code>, <code>min_duration_ms</code>, <code>name</code></p>
+        <p><strong>Note:</strong> traced responses carry an <code>X-Trace-Id</code> header; send <code>X-Trace: 1</code> to force tracing. Requires <code>X-Admin-Token</code> when ADMIN_TOKEN is set.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
 # TAB 2: Request/Response Schemas
 with tab2:
     st.markdown("## 📦 Request/Response Schemas")
@@ -165,6 +219,13 @@ with tab2:
     }
     st.json(request_schema)
     
+    st.markdown("### Response Options")
+    st.markdown("""
+    - `?fields=optimized_code,benchmarks.speedup_factor` returns only those (dotted) fields; `?fields=compact` is a preset with the optimized code, speedup, equivalence, safety and confidence verdicts
+    - `?format=msgpack` (or `Accept: application/msgpack`) returns MessagePack instead of JSON
+    - Responses over 1 KB are gzip-compressed for clients sending `Accept-Encoding: gzip`
+    """)
+    
     st.markdown("---")
     
     st.markdown("### Response Schema (Hybrid /optimize)")
@@ -183,15 +244,20 @@ with tab2:
         ],
         "benchmarks": {
             "original": {
-                "runtime_ms": "number",
+                "runtime_ms": "number | null (null when below timer resolution)",
+                "below_resolution": "boolean",
                 "memory_mb": "number",
-                "variance_pct": "number"
+                "variance_pct": "number",
+                "peak_bytes_per_call": "number (high-water mark above the call's start)",
+                "net_blocks_per_call": "number (blocks still allocated after a call)",
+                "retained_bytes_per_call": "number",
+                "gc": {"collections": "object", "gc_time_pct": "number"}
             },
             "optimized": {
-                "runtime_ms": "number",
+                "runtime_ms": "number | null",
                 "memory_mb": "number"
             },
-            "speedup_factor": "number"
+            "speedup_factor": "number | null (null when either side is below timer resolution)"
         },
         "safety_analysis": {
             "is_safe": "boolean",
@@ -209,6 +275,11 @@ with tab2:
             "changes": ["string"]
         },
         "ai_explanation": "string",
+        "timings": {
+            "stages": {"<stage>": {"start_ms": "number", "duration_ms": "number"}},
+            "total_ms": "number (critical path)",
+            "sum_ms": "number (sequential equivalent)"
+        },
         "timestamp": "ISO 8601 datetime"
     }
     st.json(response_schema)
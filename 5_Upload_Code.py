@@ -1,6 +1,6 @@
 import streamlit as st
 from utils.auth import require_auth, get_current_user
-from utils import api
+from job_client import run_job
 import hashlib
 from datetime import datetime
 
@@ -120,11 +120,8 @@ if uploaded_file:
         
         # Process optimization
         if optimize_btn:
-            with st.spinner("🔄 Optimizing your code..."):
-                if opt_mode == "🤖 AI-Powered (Recommended)":
-                    result = api.api_client.upload_file(file_content, uploaded_file.name)
-                else:
-                    result = api.api_client.optimize_rules_only(file_content, simple=False)
+            mode = "hybrid" if opt_mode == "🤖 AI-Powered (Recommended)" else "rules_only"
+            result = run_job(file_content, mode, "🔄 Optimizing your code...")
             
             if result.get("status") == "SUCCESS":
                 st.markdown("---")
@@ -139,26 +136,34 @@ if uploaded_file:
                     if benchmarks:
                         st.markdown("### 📈 Performance Improvements")
                         
-                        speedup = benchmarks.get("speedup_factor", 1.0)
-                        orig_bench = benchmarks.get("original", {})
-                        opt_bench = benchmarks.get("optimized", {})
+                        speedup = benchmarks.get("speedup_factor")
+                        orig_bench = benchmarks.get("original") or {}
+                        opt_bench = benchmarks.get("optimized") or {}
+                        orig_ms = orig_bench.get("runtime_ms")
+                        opt_ms = opt_bench.get("runtime_ms")
                         
                         metric_col1, metric_col2, metric_col3 = st.columns(3)
                         
                         with metric_col1:
-                            st.metric(
-                                "Speedup Factor",
-                                f"{speedup}x",
-                                f"+{((speedup - 1) * 100):.1f}%"
-                            )
+                            if speedup is not None:
+                                st.metric(
+                                    "Speedup Factor",
+                                    f"{speedup}x",
+                                    f"+{((speedup - 1) * 100):.1f}%"
+                                )
+                            else:
+                                st.metric("Speedup Factor", "N/A", "below timer resolution", delta_color="off")
                         
                         with metric_col2:
-                            time_saved = orig_bench.get("runtime_ms", 0) - opt_bench.get("runtime_ms", 0)
-                            st.metric(
-                                "Time Saved",
-                                f"{time_saved:.2f} ms",
-                                f"-{(time_saved / orig_bench.get('runtime_ms', 1) * 100):.1f}%"
-                            )
+                            if orig_ms is not None and opt_ms is not None:
+                                time_saved = orig_ms - opt_ms
+                                st.metric(
+                                    "Time Saved",
+                                    f"{time_saved:.2f} ms",
+                                    f"-{(time_saved / orig_ms * 100):.1f}%"
+                                )
+                            else:
+                                st.metric("Time Saved", "N/A", "below timer resolution", delta_color="off")
                         
                         with metric_col3:
                             mem_saved = orig_bench.get("memory_mb", 0) - opt_bench.get("memory_mb", 0)
@@ -240,7 +245,7 @@ if uploaded_file:
                         "Job ID": f"CF-{datetime.now().strftime('%Y%m%d')}-{file_hash}",
                         "Date": datetime.now().strftime("%Y-%m-%d %H:%M"),
                         "Mode": result.get("mode", "UNKNOWN"),
-                        "Speedup": f"{speedup}x" if benchmarks else "N/A",
+                        "Speedup": f"{speedup}x" if benchmarks and speedup is not None else "N/A",
                         "Status": "✅ Success",
                         "File": uploaded_file.name
                     }
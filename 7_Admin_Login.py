@@ -199,50 +199,98 @@ with tab2:
 with tab3:
     st.markdown("### 📊 System Analytics")
     
+    import requests
+    import plotly.express as px
+    
+    try:
+        summary = requests.get(f"{backend_url}/metrics/summary", timeout=api_timeout).json()
+    except Exception as e:
+        st.error(f"❌ Could not load metrics from {backend_url}: {e}")
+        summary = {"counters": {}, "gauges": {}, "histograms": {}}
+    
+    def series(kind, name):
+        return summary[kind].get(f"codeforge_{name}", [])
+    
+    def total(name, **match):
+        return sum(
+            s["value"] for s in series("counters", name)
+            if all(s["labels"].get(k) == v for k, v in match.items())
+        )
+    
+    def ratio(part, whole):
+        return f"{part / whole * 100:.0f}%" if whole else "—"
+    
     # System stats
+    runs = total("optimize_requests_total")
+    result_hits = total("optimize_requests_total", cache="hit") + total("optimize_requests_total", cache="coalesced")
+    bench_lookups = total("bench_cache_requests_total")
+    http_total = total("http_requests_total")
+    http_errors = sum(
+        s["value"] for s in series("counters", "http_requests_total") if s["labels"]["status"].startswith("5")
+    )
+    
     stat_col1, stat_col2, stat_col3, stat_col4 = st.columns(4)
     
     with stat_col1:
-        st.metric("Total Users", "3", "+1")
+        st.metric("Optimize Runs", f"{runs:.0f}")
     
     with stat_col2:
-        st.metric("Optimizations Today", "47", "+12")
+        st.metric("Result Cache Hit Rate", ratio(result_hits, runs), help="Cache hits plus coalesced duplicates")
     
     with stat_col3:
-        st.metric("Avg Speedup", "2.3x", "+0.2x")
+        st.metric("Benchmark Cache Hit Rate", ratio(total("bench_cache_requests_total", result="hit"), bench_lookups))
     
     with stat_col4:
-        st.metric("Success Rate", "96%", "+2%")
+        st.metric("HTTP 5xx Rate", ratio(http_errors, http_total))
     
     st.markdown("---")
     
-    # Usage over time
-    st.markdown("#### 📈 Usage Trends")
+    # Stage latency
+    st.markdown("#### ⏱️ Pipeline Stage Latency")
+    
+    errors = {s["labels"]["stage"]: s["value"] for s in series("counters", "stage_errors_total")}
+    stages = pd.DataFrame([
+        {
+            "Stage": h["labels"]["stage"],
+            "Runs": h["count"],
+            "Mean (ms)": round(h["mean"] * 1000, 1),
+            "p50 ≤ (ms)": h["p50"] * 1000,
+            "p95 ≤ (ms)": h["p95"] * 1000,
+            "Errors": errors.get(h["labels"]["stage"], 0)
+        }
+        for h in series("histograms", "stage_duration_seconds")
+    ])
     
-    import plotly.express as px
+    if stages.empty:
+        st.info("No pipeline runs recorded since the API started.")
+    else:
+        fig = px.bar(stages, x="Stage", y="Mean (ms)", title="Mean Latency per Stage")
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(stages, use_container_width=True, hide_index=True)
+        st.caption("p50/p95 are histogram bucket upper bounds.")
     
-    # Mock data
-    df_usage = pd.DataFrame({
-        "Date": pd.date_range("2025-01-01", periods=30, freq="D"),
-        "Optimizations": [15, 20, 18, 25, 30, 28, 35, 40, 38, 45, 42, 50, 48, 55, 52, 
-                         60, 58, 65, 62, 70, 68, 75, 72, 80, 78, 85, 82, 90, 88, 95]
-    })
+    st.markdown("---")
     
-    fig = px.line(df_usage, x="Date", y="Optimizations", title="Daily Optimizations")
-    st.plotly_chart(fig, use_container_width=True)
+    # Queue depths
+    st.markdown("#### 📥 Queues")
     
-    st.markdown("---")
+    queue_col1, queue_col2 = st.columns(2)
+    
+    with queue_col1:
+        st.metric("Jobs Queued", f"{sum(s['value'] for s in series('gauges', 'jobs_queued')):.0f}")
     
-    # Top users
-    st.markdown("#### 🏆 Top Users")
+    with queue_col2:
+        st.metric("Optimizations In Flight", f"{sum(s['value'] for s in series('gauges', 'requests_in_flight')):.0f}")
     
-    top_users = pd.DataFrame({
-        "User": ["admin", "developer", "user"],
-        "Optimizations": [150, 95, 80],
-        "Avg Speedup": ["2.5x", "2.1x", "1.9x"]
-    })
+    running = {s["labels"]["stage"]: s["value"] for s in series("gauges", "stage_running")}
+    queues = pd.DataFrame([
+        {"Stage": s["labels"]["stage"], "Waiting": s["value"], "Running": running.get(s["labels"]["stage"], 0)}
+        for s in series("gauges", "stage_queue_depth")
+    ])
+    if not queues.empty:
+        st.dataframe(queues, use_container_width=True, hide_index=True)
     
-    st.dataframe(top_users, use_container_width=True, hide_index=True)
+    st.caption(f"Prometheus scrape endpoint: `{backend_url}/metrics`")
 
 # TAB 4: Danger Zone
 with tab4:
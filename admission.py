@@ -0,0 +1,225 @@
+# admission.py
+import asyncio
+import itertools
+import math
+import time
+from typing import Dict, List, Optional
+from config import (
+    ADMISSION_ENABLED,
+    ADMISSION_LANES,
+    ADMISSION_COSTS,
+    ADMISSION_RATES,
+    ADMISSION_QUEUE_TIMEOUT
+)
+
+ADMIN = "admin"
+MAX_BUCKETS = 10000
+
+
+class Saturated(Exception):
+    """Request refused; the client should retry after retry_after seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, cost: float) -> float:
+        """Take cost tokens; returns 0, or the seconds until they'd be available."""
+        self._refill()
+        cost = min(cost, self.burst)  # a big batch drains the bucket rather than never fitting
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.burst
+
+
+class Lane:
+    """
+    A concurrency limit with a bounded wait queue. Freed slots go to the
+    waiter with the best priority, then to the user with the fewest
+    requests running in this lane, then first come first served, so one
+    user's burst can't hold every slot.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.running = 0
+        self.by_user: Dict[str, int] = {}
+        self.service_s: Optional[float] = None  # moving average of time holding a slot
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def bounded_waiting(self) -> int:
+        """Waiters counted against the queue bound (unbounded ones, e.g. batch items, aren't)."""
+        return sum(1 for w in self._waiters if w[4])
+
+    def retry_after(self) -> float:
+        """Rough time for the current queue to drain one slot's worth."""
+        return (self.service_s or 1.0) * (self.waiting + 1) / self.concurrency
+
+    def check(self):
+        if self.bounded_waiting >= self.queue:
+            self.stats["rejected"] += 1
+            raise Saturated(f"{self.name} lane is full", self.retry_after())
+
+    def _grant(self, user: str):
+        self.running += 1
+        self.by_user[user] = self.by_user.get(user, 0) + 1
+        self.stats["admitted"] += 1
+
+    def _wake(self):
+        while self.running < self.concurrency and self._waiters:
+            entry = min(self._waiters, key=lambda w: (w[0], self.by_user.get(w[2], 0), w[1]))
+            self._waiters.remove(entry)
+            future = entry[3]
+            if future.done():
+                continue
+            self._grant(entry[2])
+            future.set_result(None)
+
+    async def acquire(self, user: str, priority: int, bounded: bool = True, timeout: float = None):
+        if self.running < self.concurrency and not self._waiters:
+            self._grant(user)
+            return
+        if bounded:
+            self.check()
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), user, future, bounded]
+        self._waiters.append(entry)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up: hand the slot on
+                self.release(user)
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["timed_out"] += 1
+                raise Saturated(f"Timed out waiting in the {self.name} lane", self.retry_after()) from None
+            raise
+
+    def release(self, user: str, held_s: Optional[float] = None):
+        self.running -= 1
+        self.by_user[user] -= 1
+        if not self.by_user[user]:
+            del self.by_user[user]
+        if held_s is not None:
+            self.service_s = held_s if self.service_s is None else 0.8 * self.service_s + 0.2 * held_s
+        self._wake()
+
+
+class Ticket:
+    __slots__ = ("lane", "user", "start")
+
+    def __init__(self, lane: Optional[Lane], user: str):
+        self.lane = lane
+        self.user = user
+        self.start = time.perf_counter()
+
+
+class Admission:
+    """
+    Admission control in front of the optimize endpoints: per-role token
+    buckets per user (ADMISSION_RATES) and per-kind lanes (ADMISSION_LANES),
+    e.g. a fast lane for rules-only runs and cache hits and a small heavy
+    lane for LLM + benchmark runs. Admins get queue priority. Refusals raise
+    Saturated with a Retry-After estimate.
+    """
+
+    def __init__(self, lanes: Dict = None, rates: Dict = None, costs: Dict = None,
+                 timeout: float = None, enabled: bool = None):
+        self.enabled = ADMISSION_ENABLED if enabled is None else enabled
+        self.rates = rates or ADMISSION_RATES
+        self.costs = costs or ADMISSION_COSTS
+        self.timeout = ADMISSION_QUEUE_TIMEOUT if timeout is None else timeout
+        self.lanes = {
+            name: Lane(name, spec["concurrency"], spec["queue"])
+            for name, spec in (lanes or ADMISSION_LANES).items()
+        }
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.stats = {"rate_limited": 0}
+
+    def priority(self, role: str) -> int:
+        return 0 if role == ADMIN else 1
+
+    def charge(self, user: str, role: str, cost: float):
+        """Take cost tokens from the user's bucket or raise Saturated."""
+        if not self.enabled or not cost:
+            return
+        rate = self.rates.get(role) or self.rates["user"]
+        bucket = self._buckets.get(user)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                # Idle users are back at full burst; forgetting them changes nothing
+                self._buckets = {u: b for u, b in self._buckets.items() if not b.full}
+            bucket = self._buckets[user] = TokenBucket(rate["rate"], rate["burst"])
+        wait = bucket.take(cost)
+        if wait:
+            self.stats["rate_limited"] += 1
+            raise Saturated(f"Rate limit for {user} exceeded", wait)
+
+    async def admit(self, user: str, role: str, lane: str, cost: float = None, bounded: bool = True) -> Ticket:
+        """
+        Charge the user (cost defaults to the lane's; 0 skips) and wait for
+        a slot in the lane. bounded=False waits even when the queue is full,
+        for work that was already admitted (e.g. items of a batch) and for admins.
+        """
+        if not self.enabled:
+            return Ticket(None, user)
+        queue = self.lanes[lane]
+        bounded = bounded and role != ADMIN  # admins jump the queue rather than being refused by it
+        if bounded:
+            queue.check()
+        self.charge(user, role, self.costs[lane] if cost is None else cost)
+        await queue.acquire(user, self.priority(role), bounded, self.timeout or None)
+        return Ticket(queue, user)
+
+    def release(self, ticket: Ticket):
+        if ticket.lane is not None:
+            ticket.lane.release(ticket.user, time.perf_counter() - ticket.start)
+
+    def snapshot(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "lanes": {
+                name: {
+                    "running": lane.running,
+                    "waiting": lane.waiting,
+                    "concurrency": lane.concurrency,
+                    "queue": lane.queue,
+                    "service_s": round(lane.service_s, 3) if lane.service_s is not None else None,
+                    **lane.stats
+                }
+                for name, lane in self.lanes.items()
+            },
+            "users_tracked": len(self._buckets),
+            **self.stats
+        }
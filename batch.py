@@ -0,0 +1,60 @@
+# batch.py
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from config import BATCH_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+async def stream_batch(items: List[Any], pipeline: Callable[[Any], Awaitable[Dict]],
+                       concurrency: Optional[int] = None,
+                       ids: Optional[List[Optional[str]]] = None) -> AsyncIterator[str]:
+    """
+    Run pipeline over items with at most `concurrency` in flight (heavy
+    stages are further limited per stage by the executor) and yield
+    one NDJSON line per item as it finishes (completion order, tagged with
+    its index/id), then a summary line.
+    """
+    concurrency = concurrency or BATCH_CONCURRENCY
+    ids = ids or [None] * len(items)
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+
+    async def run(index: int, item: Any) -> Dict:
+        async with semaphore:
+            item_start = time.perf_counter()
+            line = {"index": index, "id": ids[index]}
+            try:
+                line.update(status="ok", result=await pipeline(item))
+            except Exception as e:
+                logger.warning(f"Batch item {index} failed: {type(e).__name__}: {e}")
+                line.update(status="error", error=getattr(e, "detail", None) or f"{type(e).__name__}: {e}")
+            line["elapsed_ms"] = round((time.perf_counter() - item_start) * 1000, 2)
+            return line
+
+    # Each item gets a fresh context, so it's traced as its own request
+    tasks = [asyncio.create_task(run(i, item), context=contextvars.Context()) for i, item in enumerate(items)]
+    failed = 0
+    try:
+        for finished in asyncio.as_completed(tasks):
+            line = await finished
+            failed += line["status"] != "ok"
+            yield json.dumps(line, default=str) + "\n"
+    finally:
+        # Client went away: don't start the rest of the batch
+        for task in tasks:
+            task.cancel()
+
+    yield json.dumps({
+        "summary": {
+            "items": len(items),
+            "succeeded": len(items) - failed,
+            "failed": failed,
+            "concurrency": concurrency,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+    }) + "\n"
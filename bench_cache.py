@@ -0,0 +1,168 @@
+# bench_cache.py
+import ast
+import hashlib
+import json
+import os
+import platform
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from config import BENCH_CACHE_PATH, BENCH_CACHE_TTL, BENCHMARK_TARGET_TIME
+
+# Bump when timing semantics change so old samples stop matching
+HARNESS_VERSION = "7"
+
+
+def code_fingerprint(code: str) -> str:
+    """Hash of the AST, so comments and formatting don't change the key."""
+    try:
+        canonical = ast.dump(ast.parse(code), annotate_fields=False)
+    except SyntaxError:
+        canonical = code
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def environment_fingerprint() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "implementation": sys.implementation.name,
+        "cpu": _cpu_model(),
+        "machine": platform.machine(),
+        "harness": HARNESS_VERSION,
+        "target_time": BENCHMARK_TARGET_TIME
+    }
+
+
+_ENV = environment_fingerprint()
+_ENV_HASH = hashlib.sha256(json.dumps(_ENV, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def environment_hash() -> str:
+    """Short hash of environment_fingerprint() for the node this runs on."""
+    return _ENV_HASH
+
+
+def run_pair(bench: Callable, original: str, optimized: str, *args, **kwargs) -> Dict:
+    """
+    Benchmark job for both sides of a pair, run back to back on one node so a
+    speedup never compares timings from two machines. Each side is
+    {"result", "status"}; "env" is the environment that produced them.
+    """
+    pair = {"env": _ENV_HASH}
+    for side, code in (("original", original), ("optimized", optimized)):
+        try:
+            pair[side] = {"result": bench(code, *args, **kwargs), "status": "ok"}
+        except Exception as e:
+            pair[side] = {"result": None, "status": "crashed", "error": f"{type(e).__name__}: {e}"}
+    return pair
+
+
+def pair_sides(pair: Optional[Dict], status: str) -> Tuple[Tuple, Tuple]:
+    """((result, status), (result, status)) for original and optimized; a failed job fails both."""
+    if pair is None:
+        return (None, status), (None, status)
+    return tuple((pair[side]["result"], pair[side]["status"]) for side in ("original", "optimized"))
+
+
+class BenchmarkCache:
+    """
+    Persistent SQLite store of benchmark results (including raw samples),
+    keyed by code fingerprint + workload + the environment fingerprint of
+    the node that ran the benchmark.
+    """
+
+    def __init__(self, path: str = None, ttl: int = None):
+        self.path = path or BENCH_CACHE_PATH
+        self.ttl = BENCH_CACHE_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS benchmarks ("
+                    "key TEXT PRIMARY KEY, env TEXT, created REAL, result TEXT)"
+                )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(code: str, *context, env: str = None) -> str:
+        """Key for a benchmark of `code` on `env` (default this node); context covers runs, workload, args, etc."""
+        parts = [code_fingerprint(code), env or _ENV_HASH] + [json.dumps(c, sort_keys=True, default=repr) for c in context]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT created, result FROM benchmarks WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[0] > self.ttl:
+            return None
+        return json.loads(row[1])
+
+    def put(self, key: str, result: Dict, env: str = None):
+        if not self.enabled or result is None:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO benchmarks (key, env, created, result) VALUES (?, ?, ?, ?)",
+                (key, env or _ENV_HASH, time.time(), json.dumps(result))
+            )
+
+    def get_pair(self, envs: List[str], original: str, optimized: str, *context) -> Optional[Dict]:
+        """Cached run_pair() result from the first of `envs` holding both sides, else None."""
+        for env in envs:
+            results = [self.get(self.make_key(code, *context, env=env)) for code in (original, optimized)]
+            if None not in results:
+                return {"env": env, "original": {"result": results[0], "status": "ok"},
+                        "optimized": {"result": results[1], "status": "ok"}}
+        return None
+
+    def put_pair(self, pair: Dict, original: str, optimized: str, *context):
+        """Store both sides of a run_pair() result under the environment that produced it."""
+        for side, code in (("original", original), ("optimized", optimized)):
+            self.put(self.make_key(code, *context, env=pair["env"]), pair[side]["result"], env=pair["env"])
+
+    def purge_expired(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._lock, self._connect() as conn:
+            cur = conn.execute("DELETE FROM benchmarks WHERE created < ?", (time.time() - self.ttl,))
+            return cur.rowcount
+
+    def cached(self, key: str, compute: Callable[[], Optional[Dict]]) -> Tuple[Optional[Dict], str]:
+        """Return (result, "hit"|"miss"), computing and storing on a miss."""
+        result = self.get(key)
+        if result is not None:
+            return result, "hit"
+        result = compute()
+        self.put(key, result)
+        return result, "miss"
+
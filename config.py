@@ -7,24 +7,168 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME", "gemini-2.5-flash")
 
-# Validation
-if not GEMINI_API_KEY:
-    raise RuntimeError(
-        "GEMINI_API_KEY not found in environment!\n"
-        "Please create a .env file with your API key.\n"
-        "See .env.example for template."
-    )
+# AI provider: "gemini" when a key is set, otherwise "none" (offline, rules engine only).
+# /optimize degrades to rules-only without a provider; nothing AI-related is imported at startup.
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini" if GEMINI_API_KEY else "none")
 
 # API Settings
 API_TIMEOUT = 30
 MAX_CODE_LENGTH = 10000
+ENGINE_VERSION = "1.0"  # bump to invalidate cached /optimize responses
+
+# Semantic Pattern Model (loaded lazily; warmed after startup unless disabled)
+SEMANTIC_MODEL_NAME = os.getenv("SEMANTIC_MODEL_NAME", "microsoft/codebert-base")
+SEMANTIC_WARMUP = os.getenv("SEMANTIC_WARMUP", "1") == "1"
+
+# Whole-Response Cache (in-memory LRU + SQLite; TTL 0 disables)
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "data/result_cache.sqlite3")
+RESULT_CACHE_SIZE = 256  # responses kept in memory
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(7 * 86400)))  # seconds
+
+# Async Jobs (/jobs)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # pipelines running at once
+JOB_TTL = 3600  # seconds finished jobs stay queryable
+JOB_MAX_STORED = 1000
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))  # further submissions get 429
+
+# Pipeline Stage Execution (keeps the event loop free)
+# "process" for stages that hold the GIL, "thread" for ones that release it or wait on subprocesses
+STAGE_POOLS = {
+    "analyze": "process",
+    "transform": "process",
+    "safety": "process",
+    "semantic": "thread",  # torch inference releases the GIL
+    "profile": "thread",  # waits on a sandbox worker
+    "equivalence": "thread",
+    "benchmark": "thread",
+}
+STAGE_LIMITS = {  # concurrent runs per stage
+    "analyze": 4,
+    "transform": 4,
+    "safety": 4,
+    "semantic": 1,
+    "profile": 4,
+    "equivalence": 2,
+    "benchmark": 2,
+}
+STAGE_PROCESS_WORKERS = int(os.getenv("STAGE_PROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+STAGE_THREAD_WORKERS = int(os.getenv("STAGE_THREAD_WORKERS", "16"))
+
+# Metrics (/metrics, Prometheus text format)
+METRICS_PREFIX = "codeforge"
+METRICS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]  # stage latency, seconds
+
+# Request Tracing (spans per request; ring buffer at /admin/traces)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))  # fraction of requests traced; "X-Trace: 1" forces
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "500"))  # finished traces kept in memory
+TRACE_FILE = os.getenv("TRACE_FILE", "")  # JSONL export path, e.g. data/traces.jsonl (empty = memory only)
+
+# Admin endpoints: when set, require the "X-Admin-Token" header
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Caller identity: the frontend signs the logged-in user into an "Authorization: Bearer"
+# token with this secret (shared by frontend and API). Unset = every caller is keyed by IP.
+IDENTITY_SECRET = os.getenv("IDENTITY_SECRET", "")
+IDENTITY_TTL = 3600  # seconds a signed identity token stays valid
+
+# Admission Control (429 + Retry-After when saturated)
+# Callers are identified by their signed identity token (client IP otherwise); the admin
+# role also needs ADMIN_TOKEN to be set and sent as X-Admin-Token.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_LANES = {  # concurrent requests and bounded wait queue per pipeline kind
+    "fast": {"concurrency": 8, "queue": 64},  # rules-only runs and cache hits
+    "heavy": {"concurrency": 2, "queue": 16},  # LLM + benchmark runs
+}
+ADMISSION_COSTS = {"fast": 1, "heavy": 4}  # tokens per request
+ADMISSION_RATES = {  # per-user token buckets by role: tokens/second and burst
+    "admin": {"rate": 2.0, "burst": 60},
+    "user": {"rate": 0.5, "burst": 20},
+    "anonymous": {"rate": 0.2, "burst": 10},
+}
+ADMISSION_QUEUE_TIMEOUT = 60  # seconds a request may wait for a lane slot (0 = no limit)
+
+# Response Shaping (?fields=, ?format=msgpack, gzip)
+FIELD_PRESETS = {  # named field sets usable in ?fields=
+    "compact": [
+        "mode", "status", "optimized_code", "benchmarks.speedup_factor", "equivalence.equivalent",
+        "safety_analysis.is_safe", "confidence.overall", "degraded", "cache",
+    ],
+}
+GZIP_MIN_SIZE = 1024  # bytes; smaller responses aren't worth compressing
+GZIP_LEVEL = 5  # 1-9: lower spends less CPU per response
+
+# Batch Endpoints (NDJSON streaming)
+BATCH_MAX_ITEMS = 500
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))  # items in flight per batch
+BATCH_MAX_CONCURRENCY = 32
 
 # Benchmark Settings
 BENCHMARK_RUNS = 3
-BENCHMARK_ITERATIONS = 50
+BENCHMARK_TARGET_TIME = 0.1  # seconds per timed sample (iterations auto-calibrated)
+BENCHMARK_MAX_ITERATIONS = 1_000_000
+BENCHMARK_WARMUP_CALLS = 1
+BENCHMARK_MIN_SIGNAL = 0.1  # corrected runtime below this fraction of harness overhead is noise
+BENCHMARK_MEMORY_CALLS = 5  # max traced calls for memory, within BENCHMARK_TARGET_TIME (tracemalloc is slow)
+# Cores benchmark jobs may be pinned to, e.g. "2,3" (default: all usable cores)
+BENCH_CORES = [int(c) for c in os.getenv("BENCH_CORES", "").split(",") if c.strip()]
+BENCH_SLOT_TIMEOUT = 60  # seconds to wait for a free core
+FUNCTION_BENCH_SIZE = 20  # default int value / collection length for generated arguments
+WORKLOAD_DEFAULT_SIZE = 20  # synthetic stdin: scalar value / items per line / loop reads
+PROFILE_TOP_LINES = 10  # hot lines returned per profile
+
+# Sandboxed Benchmark Workers (SANDBOX_ENABLED=0 runs jobs in-process)
+SANDBOX_ENABLED = os.getenv("SANDBOX_ENABLED", "1") == "1"
+# "forkserver" forks workers from a preloaded server; falls back to "spawn" where unsupported
+SANDBOX_START_METHOD = os.getenv("SANDBOX_START_METHOD", "forkserver")
+SANDBOX_REUSE_WORKERS = os.getenv("SANDBOX_REUSE_WORKERS", "0") == "1"
+FORKSERVER_PRELOAD = [
+    # Harness modules every benchmark job needs
+    "utils", "function_bench", "profiler", "scaling", "workloads", "equivalence",
+    # Common stdlib / scientific imports in submissions
+    "collections", "itertools", "functools", "heapq", "bisect", "math",
+    "statistics", "re", "json", "random", "string", "numpy", "pandas",
+]
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", "0"))  # 0 = one per benchmark core
+SANDBOX_WALL_TIMEOUT = 30  # seconds per job
+SANDBOX_CPU_TIMEOUT = 30  # CPU seconds per job (RLIMIT_CPU)
+SANDBOX_SCALING_TIMEOUT = 120  # scaling sweeps run many sizes in one job
+SANDBOX_MEMORY_MB = 2048  # address-space limit per worker (RLIMIT_AS)
+SANDBOX_MAX_OUTPUT_BYTES = 1_000_000  # captured stdout, files written, pickled result
+
+# Distributed Benchmarking (empty address = all jobs run in the local sandbox)
+# "host:port" for TCP or a filesystem path for a Unix socket; workers: `python coordinator.py worker`
+COORDINATOR_ADDRESS = os.getenv("COORDINATOR_ADDRESS", "")
+COORDINATOR_AUTHKEY = os.getenv("COORDINATOR_AUTHKEY", "").encode("utf-8")  # required: jobs are pickled code
+COORDINATOR_LEASE_TTL = 15  # seconds a job stays leased without a heartbeat
+COORDINATOR_HEARTBEAT = 3  # seconds between worker heartbeats
+COORDINATOR_MAX_ATTEMPTS = 3  # leases per job before giving up on lost workers
+COORDINATOR_QUEUE_TIMEOUT = 60  # extra seconds a job may wait for a free worker
+
+# Benchmark Cache (SQLite; TTL 0 disables)
+BENCH_CACHE_PATH = os.getenv("BENCH_CACHE_PATH", "data/bench_cache.sqlite3")
+BENCH_CACHE_TTL = int(os.getenv("BENCH_CACHE_TTL", "86400"))  # seconds
+
+# Differential Equivalence Checking
+EQUIVALENCE_SIZES = [0, 1, 5, 20]  # generated argument / synthetic stdin sizes (edge cases first)
+EQUIVALENCE_SEEDS = [0, 1]
+EQUIVALENCE_TIMEOUT = 10  # seconds per observed run
+EQUIVALENCE_MAX_MISMATCHES = 10  # reported per check
+
+# Profile-Guided Optimization
+PGO_COVERAGE = 80.0  # stop adding regions once this % of runtime is covered
+PGO_MAX_REGIONS = 5
+PGO_MIN_REGION_PCT = 5.0  # ignore regions cheaper than this
+
+# Scaling Benchmarks
+SCALING_SIZES = [16, 32, 64, 128, 256, 512, 1024]
+SCALING_RUNS = 2
+SCALING_MAX_SAMPLE_TIME = 2.0  # seconds; larger sizes are skipped past this
+SCALING_PRODUCTION_SIZE = 1_000_000
 
 # Safety Thresholds
 MICRO_OPTIMIZATION_THRESHOLD = 1.05  # 5% speedup minimum
 CODE_GROWTH_THRESHOLD = 1.2  # 20% max code growth
 MEMORY_BLOAT_THRESHOLD = 1.5  # 50% max memory increase
+PEAK_MEMORY_THRESHOLD = 1.5  # 50% max increase in peak bytes per benchmarked call
+GC_PRESSURE_THRESHOLD = 5.0  # max added percentage points of runtime spent in gc
 COMPLEXITY_THRESHOLD = 1.3  # 30% max complexity increase
@@ -0,0 +1,368 @@
+# coordinator.py
+import argparse
+import itertools
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import (
+    COORDINATOR_ADDRESS,
+    COORDINATOR_AUTHKEY,
+    COORDINATOR_LEASE_TTL,
+    COORDINATOR_HEARTBEAT,
+    COORDINATOR_MAX_ATTEMPTS,
+    COORDINATOR_QUEUE_TIMEOUT,
+    SANDBOX_WALL_TIMEOUT
+)
+from bench_cache import environment_hash
+from sandbox import run_guarded
+
+logger = logging.getLogger(__name__)
+
+# Outcome when every attempt was lost with its worker
+WORKER_LOST = "worker_lost"
+
+
+def require_authkey(authkey: Optional[bytes]) -> bytes:
+    """
+    The configured key, or raise: jobs and results are pickles, so anyone
+    holding the key can run code on the other end. There is no default.
+    """
+    authkey = authkey or COORDINATOR_AUTHKEY
+    if not authkey:
+        raise RuntimeError("COORDINATOR_AUTHKEY must be set to run a benchmark coordinator or worker")
+    return authkey
+
+
+def parse_address(address: str):
+    """"host:port" -> TCP, anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+class _Job:
+    def __init__(self, job_id: int, fn: Callable, args: tuple, kwargs: Dict, timeout: float):
+        self.id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.attempts = 0
+        self.worker = None
+        self.lease_expires = 0.0
+        self.result = None
+        self.done = threading.Event()
+
+
+class Coordinator:
+    """
+    Hands benchmark jobs to remote worker nodes.
+
+    Workers connect (TCP or Unix socket, HMAC-authenticated by
+    multiprocessing.connection), pull jobs with "lease" requests and run
+    them in their own sandbox. A lease lasts COORDINATOR_LEASE_TTL seconds
+    and is extended by heartbeats; a job whose worker disconnects or stops
+    heartbeating is requeued, up to COORDINATOR_MAX_ATTEMPTS times. The
+    first result reported for a job wins.
+    """
+
+    def __init__(self, address: str = None, authkey: bytes = None):
+        self.address = parse_address(address or COORDINATOR_ADDRESS)
+        self.authkey = require_authkey(authkey)
+        self._queue = deque()
+        self._leased: Dict[int, _Job] = {}
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._workers: Dict[str, float] = {}
+        self._envs: Dict[str, str] = {}  # worker -> environment_hash() it reported
+        self._listener = None
+        self._stopped = threading.Event()
+        self.stats = {"submitted": 0, "completed": 0, "requeued": 0, "lost": 0}
+
+    def start(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self.address = self._listener.address
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._reap_loop, daemon=True).start()
+        logger.info(f"Benchmark coordinator listening on {self.address}")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.close()
+
+    @property
+    def workers(self) -> int:
+        with self._cond:
+            return len(self._workers)
+
+    def environments(self) -> List[str]:
+        """Distinct benchmark environments among the connected workers."""
+        with self._cond:
+            return list(dict.fromkeys(self._envs.values()))
+
+    # ---- API side ----
+
+    def submit(self, fn: Callable, *args, timeout: float = None, **kwargs) -> Tuple[Any, Dict]:
+        """Queue a job and block until a worker reports it. Same contract as run_guarded."""
+        if timeout is None:
+            timeout = SANDBOX_WALL_TIMEOUT
+        job = _Job(next(self._ids), fn, args, kwargs, timeout)
+        start = time.perf_counter()
+        with self._cond:
+            self._queue.append(job)
+            self.stats["submitted"] += 1
+            self._cond.notify_all()
+
+        deadline = COORDINATOR_QUEUE_TIMEOUT + (timeout + COORDINATOR_LEASE_TTL) * COORDINATOR_MAX_ATTEMPTS
+        if not job.done.wait(deadline):
+            with self._cond:
+                if job in self._queue:
+                    self._queue.remove(job)
+                self._leased.pop(job.id, None)
+            job.result = (None, {"status": "timeout", "error": "No worker finished the job in time"})
+
+        value, outcome = job.result
+        outcome = {
+            **outcome,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            "worker": job.worker,
+            "attempts": job.attempts
+        }
+        return value, outcome
+
+    # ---- worker side ----
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._stopped.is_set():
+                    return
+                continue  # failed handshake (bad authkey etc.)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _lease(self, worker: str) -> Optional[_Job]:
+        with self._cond:
+            if not self._queue:
+                self._cond.wait(timeout=1.0)
+            if not self._queue:
+                return None
+            job = self._queue.popleft()
+            job.attempts += 1
+            job.worker = worker
+            job.lease_expires = time.monotonic() + COORDINATOR_LEASE_TTL
+            self._leased[job.id] = job
+            return job
+
+    def _requeue(self, job: _Job, reason: str):
+        """Caller holds the lock."""
+        self._leased.pop(job.id, None)
+        if job.done.is_set():
+            return
+        if job.attempts < COORDINATOR_MAX_ATTEMPTS:
+            logger.warning(f"Requeueing job {job.id} from {job.worker}: {reason}")
+            self.stats["requeued"] += 1
+            self._queue.appendleft(job)
+            self._cond.notify_all()
+        else:
+            self.stats["lost"] += 1
+            job.result = (None, {"status": WORKER_LOST, "error": reason})
+            job.done.set()
+
+    def _serve(self, conn):
+        worker = None
+        try:
+            while not self._stopped.is_set():
+                message = conn.recv()
+                kind = message[0]
+                if kind == "hello":
+                    _, worker, env = message
+                    with self._cond:
+                        self._workers[worker] = time.monotonic()
+                        self._envs[worker] = env
+                elif kind == "lease":
+                    job = self._lease(worker)
+                    if job is None:
+                        conn.send(("idle",))
+                    else:
+                        conn.send(("job", job.id, job.fn, job.args, job.kwargs, job.timeout))
+                elif kind == "heartbeat":
+                    with self._cond:
+                        self._workers[worker] = time.monotonic()
+                        job = self._leased.get(message[1])
+                        if job is not None and job.worker == worker:
+                            job.lease_expires = time.monotonic() + COORDINATOR_LEASE_TTL
+                elif kind == "result":
+                    _, job_id, value, outcome = message
+                    with self._cond:
+                        job = self._leased.pop(job_id, None)
+                        if job is not None and not job.done.is_set():
+                            job.result = (value, outcome)
+                            self.stats["completed"] += 1
+                            job.done.set()
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            with self._cond:
+                self._workers.pop(worker, None)
+                self._envs.pop(worker, None)
+                for job in [j for j in self._leased.values() if j.worker == worker]:
+                    self._requeue(job, "worker disconnected")
+
+    def _reap_loop(self):
+        while not self._stopped.wait(1.0):
+            now = time.monotonic()
+            with self._cond:
+                for job in [j for j in self._leased.values() if j.lease_expires < now]:
+                    self._requeue(job, "lease expired")
+
+
+def run_worker(address: str = None, authkey: bytes = None, name: str = None):
+    """Worker node: pull jobs from the coordinator and run them in the local sandbox."""
+    address = parse_address(address or COORDINATOR_ADDRESS)
+    authkey = require_authkey(authkey)
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        try:
+            conn = Client(address, authkey=authkey)
+        except OSError:
+            time.sleep(1.0)
+            continue
+        send_lock = threading.Lock()
+
+        def send(message):
+            with send_lock:
+                conn.send(message)
+
+        try:
+            send(("hello", name, environment_hash()))
+            while True:
+                send(("lease",))
+                reply = conn.recv()
+                if reply[0] != "job":
+                    continue
+                _, job_id, fn, args, kwargs, timeout = reply
+
+                running = threading.Event()
+                running.set()
+
+                def heartbeat():
+                    while running.is_set():
+                        try:
+                            send(("heartbeat", job_id))
+                        except OSError:
+                            return
+                        time.sleep(COORDINATOR_HEARTBEAT)
+
+                threading.Thread(target=heartbeat, daemon=True).start()
+                try:
+                    value, outcome = run_guarded(fn, *args, timeout=timeout, **kwargs)
+                finally:
+                    running.clear()
+                send(("result", job_id, value, outcome))
+        except (EOFError, OSError):
+            logger.warning("Lost connection to coordinator; reconnecting")
+        finally:
+            conn.close()
+
+
+_coordinator = None
+
+
+def start_coordinator() -> Optional[Coordinator]:
+    """Start the in-process coordinator when COORDINATOR_ADDRESS is configured."""
+    global _coordinator
+    if _coordinator is None and COORDINATOR_ADDRESS:
+        _coordinator = Coordinator().start()
+    return _coordinator
+
+
+def run_distributed(fn: Callable, *args, timeout: float = None, **kwargs) -> Tuple[Any, Dict]:
+    """
+    run_guarded via the worker nodes when a coordinator is running and has
+    workers connected; otherwise in the local sandbox.
+    """
+    if _coordinator is not None and _coordinator.workers:
+        return _coordinator.submit(fn, *args, timeout=timeout, **kwargs)
+    return run_guarded(fn, *args, timeout=timeout, **kwargs)
+
+
+def candidate_environments() -> List[str]:
+    """Environments a run_distributed job may execute in: the connected workers', else this node's."""
+    if _coordinator is not None and _coordinator.workers:
+        return _coordinator.environments() or [environment_hash()]
+    return [environment_hash()]
+
+
+def simulate(workers: int, jobs: int, kill_one: bool = True):
+    """Coordinator + N local worker processes on one machine, optionally killing one mid-run."""
+    from utils import robust_benchmark
+
+    authkey = os.urandom(32).hex()  # throwaway key shared with the local workers only
+    coordinator = Coordinator(address="127.0.0.1:0", authkey=authkey.encode("utf-8")).start()
+    host, port = coordinator.address
+    env = {**os.environ, "COORDINATOR_ADDRESS": f"{host}:{port}", "COORDINATOR_AUTHKEY": authkey}
+    procs = [
+        subprocess.Popen([sys.executable, __file__, "worker", "--name", f"sim-{i}"], env=env)
+        for i in range(workers)
+    ]
+    try:
+        while coordinator.workers < workers:
+            time.sleep(0.1)
+        code = "total = sum(i * i for i in range(20000))"
+        results = [None] * jobs
+
+        def submit(i):
+            results[i] = coordinator.submit(robust_benchmark, code, runs=3)
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(jobs)]
+        for t in threads:
+            t.start()
+        if kill_one:
+            time.sleep(0.5)
+            procs[0].kill()
+        for t in threads:
+            t.join()
+
+        for i, (value, outcome) in enumerate(results):
+            runtime = value["runtime_ms"] if value else None
+            print(f"job {i}: {outcome['status']} on {outcome['worker']} "
+                  f"(attempts={outcome['attempts']}) runtime_ms={runtime}")
+        print(coordinator.stats)
+    finally:
+        for p in procs:
+            p.kill()
+        coordinator.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="CodeForge distributed benchmark nodes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker_cmd = sub.add_parser("worker", help="run a benchmark worker node")
+    worker_cmd.add_argument("--address", default=None)
+    worker_cmd.add_argument("--name", default=None)
+    sim_cmd = sub.add_parser("simulate", help="coordinator + local workers on one machine")
+    sim_cmd.add_argument("--workers", type=int, default=3)
+    sim_cmd.add_argument("--jobs", type=int, default=6)
+    sim_cmd.add_argument("--no-kill", action="store_true")
+    cli = parser.parse_args()
+
+    if cli.command == "worker":
+        run_worker(cli.address, name=cli.name)
+    else:
+        simulate(cli.workers, cli.jobs, kill_one=not cli.no_kill)
@@ -0,0 +1,207 @@
+# equivalence.py
+import math
+import random
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from config import EQUIVALENCE_SIZES, EQUIVALENCE_SEEDS, EQUIVALENCE_TIMEOUT, EQUIVALENCE_MAX_MISMATCHES
+from bench_cache import code_fingerprint
+from function_bench import discover_functions, generate_arguments, load_functions, _fresh
+from utils import capture_stdout
+from workloads import WorkloadFixture, uses_stdin
+
+# Bump when observation/comparison semantics change
+EQUIVALENCE_VERSION = "2"
+
+
+def _canonical(value, depth: int = 0):
+    """Comparable, picklable form of a value (floats to 9 significant digits)."""
+    if depth > 6:
+        return "<deep>"
+    if value is None or isinstance(value, (bool, int, str, bytes)):
+        return value
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return repr(value)
+        return float(f"{value:.9g}")
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__] + [_canonical(v, depth + 1) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return ["set"] + sorted((_canonical(v, depth + 1) for v in value), key=repr)
+    if isinstance(value, dict):
+        return ["dict"] + sorted(
+            ([_canonical(k, depth + 1), _canonical(v, depth + 1)] for k, v in value.items()), key=repr
+        )
+    # Objects without value semantics: compare by type only
+    return f"<{type(value).__name__}>"
+
+
+def _state(namespace: Dict) -> Dict:
+    """User-visible globals left after a run (no modules, functions, classes)."""
+    return {
+        name: _canonical(value) for name, value in namespace.items()
+        if not name.startswith("_") and name != "input"
+        and not isinstance(value, (types.ModuleType, types.FunctionType, type, types.BuiltinFunctionType))
+    }
+
+
+def observe_module(code: str, fixture=None) -> Dict:
+    """Run a module once; record stdout, the exception type and final globals."""
+    random.seed(0)
+    namespace = {"__name__": "__main__"}
+    error = None
+    with capture_stdout() as out:
+        try:
+            compiled = compile(code, "<equivalence>", "exec")
+            if fixture is None:
+                exec(compiled, namespace)
+            else:
+                with fixture.activate(namespace):
+                    exec(compiled, namespace)
+        except Exception as e:
+            error = type(e).__name__
+    return {"stdout": out.getvalue(), "exception": error, "globals": _state(namespace)}
+
+
+def observe_function(code: str, name: str, args: List[Any], fixture=None) -> Dict:
+    """Call one top-level function; record stdout, return value, exception and mutated args."""
+    random.seed(0)
+    fn = load_functions(code, fixture=fixture).get(name)
+    if fn is None:
+        return {"stdout": "", "exception": "MissingFunction", "return": None, "args": None}
+    call_args = [_fresh(a) for a in args]
+    result, error = None, None
+    with capture_stdout() as out:
+        try:
+            result = fn(*call_args)
+        except Exception as e:
+            error = type(e).__name__
+    return {
+        "stdout": out.getvalue(),
+        "exception": error,
+        "return": _canonical(result),
+        "args": _canonical(call_args)
+    }
+
+
+def _preview(value, limit: int = 200) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _compare(original: Dict, optimized: Dict) -> List[Dict]:
+    mismatches = []
+    for field in ("exception", "stdout", "return", "args"):
+        if field in original and original.get(field) != optimized.get(field):
+            mismatches.append({
+                "kind": field,
+                "original": _preview(original.get(field)),
+                "optimized": _preview(optimized.get(field))
+            })
+    if "globals" in original:
+        # Only names both versions define; dropped temporaries are fine
+        shared = set(original["globals"]) & set(optimized["globals"])
+        changed = sorted(n for n in shared if original["globals"][n] != optimized["globals"][n])
+        if changed:
+            mismatches.append({"kind": "globals", "names": changed[:10]})
+    return mismatches
+
+
+def _inline_call(fn, *args, timeout=None, **kwargs):
+    return fn(*args, **kwargs), {"status": "ok", "error": None}
+
+
+def build_cases(original: str, optimized: str, fixture=None, vary_stdin: bool = True,
+                function_args: Optional[Dict[str, List[Any]]] = None) -> List[Dict]:
+    """
+    Inputs to compare on: the module under each stdin fixture, plus every
+    paired top-level function under generated (and user) arguments.
+    """
+    cases = []
+    fixtures = [fixture]
+    if vary_stdin and uses_stdin(original):
+        fixtures += [
+            WorkloadFixture.synthetic(original, size=size, seed=seed, argv=fixture.argv[1:] if fixture else None)
+            for size in EQUIVALENCE_SIZES for seed in EQUIVALENCE_SEEDS
+        ]
+    for i, f in enumerate(fixtures):
+        cases.append({"label": f"module#{i}", "job": observe_module, "args": (f,)})
+
+    function_args = function_args or {}
+    opt_defs = discover_functions(optimized)
+    for name, node in discover_functions(original).items():
+        if name not in opt_defs:
+            continue
+        arg_sets = [generate_arguments(node, size=size, seed=seed)
+                    for size in EQUIVALENCE_SIZES for seed in EQUIVALENCE_SEEDS]
+        if name in function_args:
+            arg_sets.insert(0, list(function_args[name]))
+        for i, args in enumerate(arg_sets):
+            cases.append({"label": f"{name}#{i}", "job": observe_function, "args": (name, args, fixture)})
+    return cases
+
+
+def check_equivalence(original: str, optimized: str, fixture=None, vary_stdin: bool = True,
+                      function_args: Optional[Dict[str, List[Any]]] = None,
+                      call: Callable = None, workers: int = 4, cache=None) -> Dict:
+    """
+    Differential check: run original and optimized on the same batch of
+    inputs in parallel (via `call`, e.g. sandbox.run_guarded) and compare
+    stdout, return values, exception types, mutated arguments and shared
+    final globals. Results are cached per code pair + inputs. If no input
+    completes on both sides the verdict is inconclusive, not equivalent.
+    """
+    start = time.perf_counter()
+    call = call or _inline_call
+
+    key = None
+    if cache is not None:
+        key = cache.make_key(
+            original, "equivalence", EQUIVALENCE_VERSION, code_fingerprint(optimized), function_args,
+            fixture.fingerprint() if fixture else None, vary_stdin, EQUIVALENCE_SIZES, EQUIVALENCE_SEEDS
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            return {**cached, "cache": "hit"}
+
+    if code_fingerprint(original) == code_fingerprint(optimized):
+        verdict = {"equivalent": True, "checked_inputs": 0, "mismatches": [], "reason": "identical code"}
+    else:
+        cases = build_cases(original, optimized, fixture, vary_stdin, function_args)
+
+        def run(case, code):
+            value, outcome = call(case["job"], code, *case["args"], timeout=EQUIVALENCE_TIMEOUT)
+            return value, outcome["status"]
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                (case, pool.submit(run, case, original), pool.submit(run, case, optimized))
+                for case in cases
+            ]
+            mismatches, checked = [], 0
+            for case, orig_future, opt_future in futures:
+                (orig, orig_status), (opt, opt_status) = orig_future.result(), opt_future.result()
+                if orig_status != "ok" or opt_status != "ok":
+                    if orig_status != opt_status:
+                        mismatches.append({"input": case["label"], "kind": "outcome",
+                                           "original": orig_status, "optimized": opt_status})
+                    continue
+                checked += 1
+                for mismatch in _compare(orig, opt):
+                    mismatches.append({"input": case["label"], **mismatch})
+
+        verdict = {
+            "equivalent": not mismatches,
+            "checked_inputs": checked,
+            "mismatches": mismatches[:EQUIVALENCE_MAX_MISMATCHES]
+        }
+        if not checked:
+            # Matching timeouts/crashes on every input prove nothing either way
+            verdict.update(equivalent=False, inconclusive=True,
+                           reason=f"None of {len(cases)} inputs ran to completion on both versions")
+
+    verdict["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    if key is not None:
+        cache.put(key, verdict)
+    return {**verdict, "cache": "miss" if key else None}
@@ -0,0 +1,142 @@
+# executor.py
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict
+from config import STAGE_POOLS, STAGE_LIMITS, STAGE_PROCESS_WORKERS, STAGE_THREAD_WORKERS
+from telemetry import observe_stage
+from tracing import span
+
+PROCESS = "process"
+THREAD = "thread"
+
+
+class StageExecutor:
+    """
+    Runs pipeline stages off the event loop.
+
+    Stages that hold the GIL (pure-Python AST analysis/transforms, safety
+    scoring) go to a process pool; stages that release it or just wait on
+    other processes (model inference, sandboxed profiling, equivalence,
+    benchmarks) go to a thread pool. Each stage also has its own
+    concurrency limit (STAGE_LIMITS), so e.g. one slow benchmark batch
+    can't take every thread. Process-stage callables and arguments must
+    be picklable.
+    """
+
+    def __init__(self, pools: Dict[str, str] = None, limits: Dict[str, int] = None,
+                 process_workers: int = None, thread_workers: int = None):
+        self.pools = pools or STAGE_POOLS
+        self.limits = limits or STAGE_LIMITS
+        self.process_workers = process_workers or STAGE_PROCESS_WORKERS
+        self.thread_workers = thread_workers or STAGE_THREAD_WORKERS
+        self._processes = None
+        self._threads = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _pool(self, kind: str):
+        with self._lock:
+            if kind == PROCESS:
+                if self._processes is None:
+                    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                    self._processes = ProcessPoolExecutor(
+                        max_workers=self.process_workers, mp_context=multiprocessing.get_context(method)
+                    )
+                return self._processes
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="stage")
+            return self._threads
+
+    def _semaphore(self, stage: str) -> asyncio.Semaphore:
+        # Created lazily so they bind to the serving event loop
+        if stage not in self._semaphores:
+            self._semaphores[stage] = asyncio.Semaphore(self.limits.get(stage, self.thread_workers))
+        return self._semaphores[stage]
+
+    async def run(self, stage: str, fn: Callable, *args, **kwargs) -> Any:
+        kind = self.pools.get(stage, THREAD)
+        stats = self.stats.setdefault(stage, {"running": 0, "waiting": 0, "completed": 0})
+        stats["waiting"] += 1
+        async with self._semaphore(stage):
+            stats["waiting"] -= 1
+            stats["running"] += 1
+            try:
+                loop = asyncio.get_running_loop()
+                call = functools.partial(fn, *args, **kwargs)
+                if kind == THREAD:
+                    # Carry the trace context into the worker thread
+                    call = functools.partial(contextvars.copy_context().run, call)
+                return await loop.run_in_executor(self._pool(kind), call)
+            finally:
+                stats["running"] -= 1
+                stats["completed"] += 1
+
+    def shutdown(self):
+        with self._lock:
+            for pool in (self._processes, self._threads):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._processes = self._threads = None
+
+
+_executor = None
+
+
+def get_executor() -> StageExecutor:
+    global _executor
+    if _executor is None:
+        _executor = StageExecutor()
+    return _executor
+
+
+async def run_stage(stage: str, fn: Callable, *args, **kwargs) -> Any:
+    return await get_executor().run(stage, fn, *args, **kwargs)
+
+
+class StageTimer:
+    """
+    Per-stage wall-clock timings for one pipeline run. Stages that overlap
+    show up with overlapping start/duration; total_ms is the critical path
+    and sum_ms what a strictly sequential run would have taken.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def measure(self, name: str):
+        """Time a block as stage `name`; also feeds the stage latency histogram and the trace."""
+        started = time.perf_counter()
+        ok = True
+        try:
+            with span(f"stage.{name}"):
+                yield
+        except Exception:
+            ok = False
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            self.stages[name] = {
+                "start_ms": round((started - self.start) * 1000, 2),
+                "duration_ms": round(duration * 1000, 2)
+            }
+            observe_stage(name, duration, ok)
+
+    async def run(self, name: str, awaitable: Awaitable) -> Any:
+        with self.measure(name):
+            return await awaitable
+
+    def summary(self) -> Dict:
+        return {
+            "stages": self.stages,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 2),
+            "sum_ms": round(sum(s["duration_ms"] for s in self.stages.values()), 2)
+        }
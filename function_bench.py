@@ -0,0 +1,222 @@
+# function_bench.py
+import ast
+import math
+import random
+import statistics
+from typing import Any, Dict, List, Optional
+from bench_cache import environment_hash, pair_sides, run_pair
+from config import FUNCTION_BENCH_SIZE, SANDBOX_WALL_TIMEOUT
+from utils import benchmark_callable, capture_stdout, speedup_ratio
+
+# Parameter-name hints used when a function has no annotations
+_INT_NAMES = {"n", "k", "m", "num", "number", "count", "size", "limit", "start", "end", "x", "y", "i", "j"}
+_LIST_NAMES = {"arr", "array", "data", "nums", "numbers", "items", "values", "lst", "list1", "list2", "seq", "a", "b"}
+_STR_NAMES = {"s", "text", "string", "word", "sentence", "name", "line"}
+_DICT_NAMES = {"d", "mapping", "dict", "table", "counts", "scores"}
+
+
+def discover_functions(code: str) -> Dict[str, ast.FunctionDef]:
+    """Top-level (module scope) function definitions by name."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return {}
+    return {
+        node.name: node for node in tree.body
+        if isinstance(node, ast.FunctionDef)
+    }
+
+
+def is_definition_only(code: str) -> bool:
+    """
+    True when running the module only defines things (functions, classes,
+    imports, constants), so exec-level timing says nothing about the work.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+                             ast.Import, ast.ImportFrom, ast.Pass)):
+            continue
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue  # docstring
+        if isinstance(node, (ast.Assign, ast.AnnAssign)) and isinstance(node.value, ast.Constant):
+            continue
+        return False
+    return True
+
+
+def _annotation_name(annotation) -> str:
+    if annotation is None:
+        return ""
+    if isinstance(annotation, ast.Subscript):
+        annotation = annotation.value
+    if isinstance(annotation, ast.Name):
+        return annotation.id.lower()
+    if isinstance(annotation, ast.Attribute):
+        return annotation.attr.lower()
+    return ""
+
+
+def _value_for(arg: ast.arg, size: int, rng: random.Random):
+    kind = _annotation_name(arg.annotation)
+    name = arg.arg.lower()
+
+    if kind in ("int",) or (not kind and name in _INT_NAMES):
+        return size
+    if kind == "float":
+        return float(size)
+    if kind == "str" or (not kind and name in _STR_NAMES):
+        return " ".join(rng.choice(["alpha", "beta", "gamma", "delta"]) for _ in range(size))
+    if kind in ("dict", "mapping") or (not kind and name in _DICT_NAMES):
+        return {f"k{i}": rng.randint(0, 1000) for i in range(size)}
+    if kind in ("set", "frozenset"):
+        return {rng.randint(0, size * 10) for _ in range(size)}
+    if kind == "bool":
+        return True
+    # Lists are the most common payload in submitted snippets
+    return [rng.randint(0, 1000) for _ in range(size)]
+
+
+def generate_arguments(node: ast.FunctionDef, size: int = None, seed: int = 0) -> List[Any]:
+    """
+    Build deterministic positional arguments for a function from its
+    annotations and parameter names. Parameters with defaults are left out.
+    """
+    if size is None:
+        size = FUNCTION_BENCH_SIZE
+    rng = random.Random(seed)
+
+    params = node.args.posonlyargs + node.args.args
+    required = params[:len(params) - len(node.args.defaults)]
+    return [_value_for(arg, size, rng) for arg in required]
+
+
+def load_functions(code: str, namespace: Optional[Dict] = None, fixture=None) -> Dict[str, Any]:
+    """
+    Exec the module once and return its top-level functions. Module-level
+    input() calls read from `fixture` so loading never blocks on stdin.
+    """
+    names = discover_functions(code)
+    if not names:
+        return {}
+    if namespace is None:
+        namespace = {"__name__": "__benchmark__"}
+    try:
+        with capture_stdout():
+            compiled = compile(code, "<benchmark>", "exec")
+            if fixture is None:
+                exec(compiled, namespace)
+            else:
+                with fixture.activate(namespace):
+                    exec(compiled, namespace)
+    except Exception:
+        return {}
+    return {name: namespace[name] for name in names if callable(namespace.get(name))}
+
+
+def _fresh(value):
+    # Functions may mutate their inputs; give every call its own container
+    if isinstance(value, (list, dict, set)):
+        return value.copy()
+    return value
+
+
+def make_call_runner(fn, args):
+    """Zero-arg callable that calls fn with fresh copies of args."""
+    def run():
+        fn(*[_fresh(a) for a in args])
+    return run
+
+
+def _noop(*args):
+    return None
+
+
+def make_call_baseline(args):
+    """Overhead baseline matching make_call_runner (copies args, calls a no-op)."""
+    return make_call_runner(_noop, args)
+
+
+def benchmark_function(code: str, name: str, args: List[Any], runs: int = None,
+                       fixture=None) -> Optional[Dict]:
+    """Load code and benchmark one call of its top-level function `name`."""
+    fn = load_functions(code, fixture=fixture).get(name)
+    if fn is None:
+        return None
+    return benchmark_callable(make_call_runner(fn, args), runs=runs, baseline=make_call_baseline(args))
+
+
+def _inline_call(fn, *args, timeout=None, **kwargs):
+    return fn(*args, **kwargs), {"status": "ok", "error": None}
+
+
+def benchmark_function_pairs(original: str, optimized: str,
+                             user_args: Optional[Dict[str, List[Any]]] = None,
+                             runs: int = None, size: int = None, fixture=None,
+                             cache=None, call=None, envs: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Pair top-level functions by name between original and optimized code and
+    benchmark a call to each side with the same arguments, both sides in one
+    job. With a BenchmarkCache, the pair is looked up by module fingerprints
+    first, in each of `envs` (default this node's environment).
+
+    `call(fn, *args)` executes each benchmark job and returns (value, outcome);
+    pass sandbox.run_guarded to keep user code out of this process.
+    """
+    user_args = user_args or {}
+    call = call or _inline_call
+    orig_defs = discover_functions(original)
+    opt_defs = discover_functions(optimized)
+    shared = [name for name in orig_defs if name in opt_defs]
+
+    results = []
+    for name in shared:
+        if name in user_args:
+            args = list(user_args[name])
+            args_source = "user"
+        else:
+            args = generate_arguments(orig_defs[name], size=size)
+            args_source = "generated"
+
+        context = ("function", name, args, runs, size, fixture.fingerprint() if fixture else None)
+        pair, status, cache_status = None, "ok", None
+        if cache is not None:
+            pair = cache.get_pair(envs or [environment_hash()], original, optimized, *context)
+            cache_status = "hit" if pair is not None else "miss"
+        if pair is None:
+            # Twice the work of a single benchmark job
+            pair, outcome = call(run_pair, benchmark_function, original, optimized, name, args, runs, fixture,
+                                 timeout=2 * SANDBOX_WALL_TIMEOUT)
+            status = outcome["status"]
+            if pair is not None and cache is not None:
+                cache.put_pair(pair, original, optimized, *context)
+        (orig_bench, orig_status), (opt_bench, opt_status) = pair_sides(pair, status)
+
+        speedup = speedup_ratio(orig_bench, opt_bench)
+
+        results.append({
+            "function": name,
+            "args_source": args_source,
+            "arg_count": len(args),
+            "original": orig_bench,
+            "optimized": opt_bench,
+            "speedup_factor": round(speedup, 2) if speedup is not None else None,
+            "speedup_ratio": speedup,  # unrounded, for aggregate_speedup
+            "env": pair["env"] if pair else None,
+            "cache": {"original": cache_status, "optimized": cache_status},
+            "outcome": {"original": orig_status, "optimized": opt_status}
+        })
+
+    return results
+
+
+def aggregate_speedup(function_results: List[Dict]) -> Optional[float]:
+    """Geometric mean of per-function speedups (None if nothing measured)."""
+    speedups = [r['speedup_ratio'] for r in function_results if r.get('speedup_ratio') is not None]
+    if not speedups:
+        return None
+    return math.exp(statistics.mean(math.log(s) for s in speedups))
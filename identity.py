@@ -0,0 +1,42 @@
+# identity.py
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Dict, Optional
+from config import IDENTITY_SECRET, IDENTITY_TTL
+
+
+def _sign(payload: bytes, secret: str) -> str:
+    return hmac.new(secret.encode("utf-8"), payload, hashlib.sha256).hexdigest()
+
+
+def issue_token(user: str, role: str, secret: str = None, ttl: int = None) -> Optional[str]:
+    """
+    Signed "who is calling" token for the frontend to send as
+    `Authorization: Bearer <token>`; None when no IDENTITY_SECRET is set.
+    """
+    secret = IDENTITY_SECRET if secret is None else secret
+    if not secret:
+        return None
+    claims = {"u": user, "r": role, "exp": int(time.time()) + (ttl or IDENTITY_TTL)}
+    payload = base64.urlsafe_b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{payload.decode('ascii')}.{_sign(payload, secret)}"
+
+
+def verify_token(token: Optional[str], secret: str = None) -> Optional[Dict]:
+    """The token's {"user", "role"} if its signature checks out and it hasn't expired, else None."""
+    secret = IDENTITY_SECRET if secret is None else secret
+    if not secret or not token or "." not in token:
+        return None
+    payload, signature = token.rsplit(".", 1)
+    if not hmac.compare_digest(_sign(payload.encode("ascii", "replace"), secret), signature):
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload.encode("ascii")))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict) or not claims.get("u") or claims.get("exp", 0) < time.time():
+        return None
+    return {"user": str(claims["u"]), "role": str(claims.get("r") or "user")}
@@ -1,41 +1,386 @@
 ## run this file first always
 from ai_explainer import generate_ai_explanation
 from semantic_search import SemanticPatternDetector
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Depends, Header
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
 import ast
+import asyncio
+import contextlib
+import functools
+import hmac
+import time
 from datetime import datetime
 
 from rules_engine import RuleBasedOptimizer
 from rule_transformer import apply_rule_based_optimizations
 from llm_optimizer import optimize_with_gemini
-from utils import robust_benchmark
+from llm_provider import llm_available
+from utils import robust_benchmark, speedup_ratio
+from function_bench import benchmark_function_pairs, aggregate_speedup, is_definition_only
+from scaling import benchmark_scaling
+from workloads import build_fixture
+from profiler import profile_code, weight_findings
+from bench_cache import BenchmarkCache, pair_sides, run_pair
+from sandbox import run_guarded, get_sandbox
+from equivalence import check_equivalence
+from coordinator import start_coordinator, run_distributed, candidate_environments
+from config import SANDBOX_ENABLED, SANDBOX_SCALING_TIMEOUT, SANDBOX_WALL_TIMEOUT, BATCH_MAX_ITEMS, BATCH_MAX_CONCURRENCY, SEMANTIC_WARMUP
+from config import ADMIN_TOKEN, ADMISSION_RATES, JOB_MAX_QUEUED, GZIP_MIN_SIZE, GZIP_LEVEL
+from pgo import select_hot_regions, transform_regions, llm_optimize_regions, pgo_summary
+from jobs import JobManager, no_report
+from batch import stream_batch
+from result_cache import ResultCache
+from singleflight import SingleFlight
+from admission import Admission, Saturated
+from identity import verify_token
+from responses import parse_fields, project, encode, wants_msgpack, MSGPACK, JSON
+from executor import run_stage, get_executor, StageTimer
+from safety import SafetyGuard
+from metrics import calculate_confidence, generate_explainability
+from telemetry import registry
+from tracing import tracer, span, set_attributes
 
 app = FastAPI()
+# Streams (SSE, NDJSON) are left uncompressed so each event/line is sent as it happens
+app.add_middleware(
+    GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL,
+    exclude_content_types=("text/event-stream", "application/x-ndjson")
+)
 rule_optimizer = RuleBasedOptimizer()
+# Model loads on first hybrid request or via background warmup, not at import
 semantic_detector = SemanticPatternDetector()
+bench_cache = BenchmarkCache()
+result_cache = ResultCache()
+inflight = SingleFlight()
+admission = Admission()
+
+
+UNTRACED_PATHS = ("/admin", "/metrics")
+
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    start = time.perf_counter()
+    traced = not request.url.path.startswith(UNTRACED_PATHS)
+    force = request.headers.get("x-trace") == "1"
+    with span("http", root=traced, force=force, method=request.method, path=request.url.path) as s:
+        response = await call_next(request)
+        if s:
+            s.set(status=response.status_code)
+            response.headers["X-Trace-Id"] = s.trace.trace_id
+    # Label by route template (/jobs/{job_id}), not the raw path
+    route = request.scope.get("route")
+    labels = {"path": getattr(route, "path", "unmatched"), "method": request.method}
+    registry.inc("http_requests_total", "HTTP requests", {**labels, "status": response.status_code})
+    registry.observe("http_request_duration_seconds", "HTTP request latency (streamed bodies: until headers)",
+                     time.perf_counter() - start, labels)
+    return response
+
+
+@app.on_event("startup")
+async def warm_sandbox():
+    # Start the fork-server (preloaded modules) and pre-fork benchmark workers
+    if SANDBOX_ENABLED:
+        await asyncio.to_thread(get_sandbox().warm)
+    # Benchmark jobs go to remote worker nodes when COORDINATOR_ADDRESS is set
+    start_coordinator()
+    # Load the semantic model off the request path; rules-only never needs it
+    if SEMANTIC_WARMUP:
+        semantic_detector.warm_in_background()
+
+
+@app.on_event("shutdown")
+async def stop_stage_pools():
+    get_executor().shutdown()
+
+
+class ScalingConfig(BaseModel):
+    # Either a module-level size variable or a top-level function to call
+    size_var: Optional[str] = None
+    function: Optional[str] = None
+    # Code defining `workload(n)` that returns the function's positional args
+    generator: Optional[str] = Field(None, max_length=10000)
+    sizes: Optional[List[int]] = Field(None, max_length=20)
+    production_size: Optional[int] = None
+
+
+class WorkloadConfig(BaseModel):
+    # Literal stdin for the program; synthesized from input() calls when omitted
+    stdin: Optional[str] = Field(None, max_length=1_000_000)
+    argv: Optional[List[str]] = None
+    size: Optional[int] = Field(None, ge=1, le=100_000)
+    seed: int = 0
 
 
 class CodeRequest(BaseModel):
     code: str = Field(..., min_length=1, max_length=10000)
+    # Positional arguments per function name, e.g. {"fib": [25]}
+    function_args: Optional[Dict[str, List[Any]]] = None
+    scaling: Optional[ScalingConfig] = None
+    workload: Optional[WorkloadConfig] = None
+    # Profile-guided: only optimize the functions/loops that dominate runtime
+    pgo: bool = False
+
+
+def check_syntax(code: str):
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        raise HTTPException(400, detail=f"Invalid Python (line {e.lineno}): {e.msg}")
+
+
+def request_fixture(req: CodeRequest):
+    """Stdin/argv fixture for a request, built from the original code."""
+    workload = req.workload or WorkloadConfig()
+    return build_fixture(req.code, **workload.model_dump())
+
+
+def profile_request(req: CodeRequest, fixture):
+    """Line profile of the original, run in the sandbox like any user code."""
+    profile, outcome = run_guarded(profile_code, req.code, fixture, req.function_args)
+    if profile is None:
+        return {"method": None, "error": outcome["status"], "total_ms": 0.0, "hotspots": []}
+    return profile
+
+
+def benchmark_modules(original: str, optimized: str, fixture=None):
+    """
+    Sandboxed module-level benchmark of both versions as one job, so both
+    run on the same node, through the cache. Returns (run_pair result, cache, outcome).
+    """
+    # A pair is served from the cache only when both sides were timed in the same environment
+    with span("benchmark.module", code_chars=len(original) + len(optimized), runs=3) as s:
+        context = ("module", 3, fixture.fingerprint() if fixture else None)
+        cached = bench_cache.get_pair(candidate_environments(), original, optimized, *context)
+        if cached is not None:
+            registry.inc("bench_cache_requests_total", "Module benchmark cache lookups", {"result": "hit"})
+            set_attributes(cache="hit", env=cached["env"])
+            return cached, "hit", "ok"
+        registry.inc("bench_cache_requests_total", "Module benchmark cache lookups", {"result": "miss"})
+        pair, outcome = run_distributed(run_pair, robust_benchmark, original, optimized,
+                                        timeout=2 * SANDBOX_WALL_TIMEOUT, runs=3, fixture=fixture)
+        if pair is not None:
+            bench_cache.put_pair(pair, original, optimized, *context)
+        if s:
+            s.set(cache="miss", outcome=outcome["status"], env=(pair or {}).get("env"),
+                  worker=outcome.get("worker"))
+        return pair, "miss", outcome["status"]
+
+
+def run_benchmarks(original: str, optimized: str, fixture=None, function_args=None, scaling=None):
+    """Benchmark both versions at module and function level. Returns (benchmarks, speedup)."""
+    pair, module_cache, module_outcome = benchmark_modules(original, optimized, fixture)
+    (original_bench, original_outcome), (optimized_bench, optimized_outcome) = pair_sides(pair, module_outcome)
+
+    speedup = speedup_ratio(original_bench, optimized_bench)
+
+    with span("benchmark.functions", runs=3) as s:
+        functions = benchmark_function_pairs(original, optimized, user_args=function_args, runs=3,
+                                             fixture=fixture, cache=bench_cache, call=run_distributed,
+                                             envs=candidate_environments())
+        if s:
+            s.set(functions=len(functions or []))
+    function_speedup = aggregate_speedup(functions)
+
+    # Exec-level timing of a definitions-only module just measures `def`
+    speedup_source = "module"
+    if function_speedup is not None and is_definition_only(original):
+        speedup = function_speedup
+        speedup_source = "functions"
+    elif speedup is None and original_bench and optimized_bench:
+        # Both ran but too fast to time apart from the harness: no speedup to report
+        speedup_source = "below_resolution"
+
+    benchmarks = {
+        "original": original_bench,
+        "optimized": optimized_bench,
+        "functions": functions,
+        "speedup_source": speedup_source,
+        "speedup_factor": round(speedup, 2) if speedup is not None else None,
+        "workload": fixture.describe() if fixture else None,
+        "env": pair["env"] if pair else None,
+        "cache": {"original": module_cache, "optimized": module_cache},
+        "outcome": {"original": original_outcome, "optimized": optimized_outcome}
+    }
+    if scaling:
+        with span("benchmark.scaling", size_var=scaling.size_var, function=scaling.function, sizes=scaling.sizes):
+            benchmarks["scaling"], scaling_outcome = run_distributed(
+                benchmark_scaling, original, optimized, timeout=SANDBOX_SCALING_TIMEOUT, **scaling.model_dump()
+            )
+        benchmarks["outcome"]["scaling"] = scaling_outcome["status"]
+    # Confidence and explanations treat "not measurable" as no change
+    return benchmarks, speedup if speedup is not None else 1.0
+
+def verify_candidate(req: CodeRequest, optimized: str, fixture=None):
+    """Differential check of the candidate against the original on shared inputs."""
+    vary_stdin = not (req.workload and req.workload.stdin is not None)
+    with span("equivalence.check", vary_stdin=vary_stdin):
+        result = check_equivalence(
+            req.code, optimized, fixture, vary_stdin=vary_stdin, function_args=req.function_args,
+            call=run_guarded, workers=get_sandbox().size if SANDBOX_ENABLED else 1, cache=bench_cache
+        )
+        set_attributes(equivalent=result["equivalent"], checked_inputs=result["checked_inputs"],
+                       cache=result.get("cache"))
+        return result
+
+
+def rejected_response(mode: str, req: CodeRequest, optimized: str, equivalence: Dict, **extra):
+    """Non-equivalent candidates are returned unbenchmarked, with the original kept."""
+    return {
+        "mode": mode,
+        "status": "rejected",
+        "original_code": req.code,
+        "optimized_code": req.code,
+        "rejected_code": optimized,
+        **extra,
+        "equivalence": equivalence,
+        "benchmarks": None,
+        "timestamp": datetime.now().isoformat()
+    }
+
+def result_cached(mode: str):
+    """
+    Serve repeat submissions of the same source from the whole-response cache,
+    and attach concurrent identical submissions to the one in-flight run.
+    """
+    def wrap(pipeline):
+        @functools.wraps(pipeline)
+        async def run(req: CodeRequest, report=no_report):
+            # Root span for jobs and batch items; nested under the HTTP span otherwise
+            with span(f"pipeline.{mode}", root=True, code_chars=len(req.code),
+                      code_lines=req.code.count("\n") + 1):
+                key = result_cache.make_key(req.code, mode, req.model_dump(exclude={"code"}))
+                cached = result_cache.get(key)
+                if cached is not None:
+                    registry.inc("optimize_requests_total", "Optimize pipeline runs by cache outcome",
+                                 {"mode": mode, "cache": "hit"})
+                    set_attributes(cache="hit")
+                    report("cache", cache="hit")
+                    return {**cached, "cache": "hit"}
+
+                async def compute():
+                    result = await pipeline(req, report)
+                    # A rejected LLM candidate deserves a fresh attempt next time
+                    if result.get("status") != "rejected":
+                        result_cache.put(key, result)
+                    return result
+
+                result, shared = await inflight.do(key, compute)
+                outcome = "coalesced" if shared else "miss"
+                registry.inc("optimize_requests_total", "Optimize pipeline runs by cache outcome",
+                             {"mode": mode, "cache": outcome})
+                set_attributes(cache=outcome, status=result.get("status", "success"))
+                if shared:
+                    report("cache", cache="coalesced")
+                return {**result, "cache": outcome}
+        return run
+    return wrap
+
+# ---------------- RESPONSE SHAPING ----------------
+def response_options(request: Request, fields: Optional[str] = None,
+                     format: Optional[Literal["json", "msgpack"]] = None) -> Dict:
+    """?fields=a,b.c (or a FIELD_PRESETS name) and ?format=msgpack / Accept: application/msgpack."""
+    return {
+        "fields": parse_fields(fields),
+        "media_type": MSGPACK if wants_msgpack(format, request.headers.get("accept")) else JSON
+    }
+
+
+def respond(result: Dict, options: Dict) -> Response:
+    return encode(project(result, options["fields"]), options["media_type"])
+
+# ---------------- ADMISSION ----------------
+def is_admin_token(x_admin_token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and x_admin_token is not None and hmac.compare_digest(x_admin_token, ADMIN_TOKEN)
+
+
+def identify_caller(request: Request, authorization: Optional[str] = Header(None),
+                    x_admin_token: Optional[str] = Header(None)) -> Dict:
+    """
+    The user from a signed identity token (see identity.py), else the
+    client address. Admin also needs the configured ADMIN_TOKEN.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    identity = verify_token(token.strip()) if scheme.lower() == "bearer" else None
+    if identity is None:
+        return {"user": f"ip:{request.client.host if request.client else 'unknown'}", "role": "anonymous"}
+    role = identity["role"] if identity["role"] in ADMISSION_RATES else "user"
+    if role == "admin" and not is_admin_token(x_admin_token):
+        role = "user"
+    return {"user": f"user:{identity['user']}", "role": role}
+
+
+def too_busy(e: Saturated) -> HTTPException:
+    return HTTPException(429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+@contextlib.asynccontextmanager
+async def admitted(caller: Dict, lane: str, cost: Optional[float] = None, bounded: bool = True):
+    """Hold a lane slot for the caller; 429 with Retry-After when rate-limited or saturated."""
+    try:
+        ticket = await admission.admit(caller["user"], caller["role"], lane, cost, bounded)
+    except Saturated as e:
+        registry.inc("admission_rejected_total", "Requests refused with 429", {"lane": lane})
+        raise too_busy(e)
+    try:
+        yield
+    finally:
+        admission.release(ticket)
+
+
+def lane_for(req: CodeRequest, mode: str) -> str:
+    """Rules-only runs (including offline hybrid) and cache hits take the fast lane."""
+    if mode == "rules_only" or not llm_available():
+        return "fast"
+    key = result_cache.make_key(req.code, mode, req.model_dump(exclude={"code"}))
+    return "fast" if result_cache.has(key) else "heavy"
 
 # ---------------- OFFLINE (FULL) ----------------
-@app.post("/optimize-rules-only")
-async def optimize_rules_only(req: CodeRequest):
-    rules = rule_optimizer.analyze(req.code)
-    optimized, transformations = apply_rule_based_optimizations(req.code, rules)
+@result_cached("rules_only")
+async def rules_only_pipeline(req: CodeRequest, report=no_report):
+    timer = StageTimer()
+    with timer.measure("parse"):
+        check_syntax(req.code)
+    fixture = request_fixture(req)
+    # Both versions are benchmarked after equivalence: profile and equivalence
+    # jobs running alongside would compete with the timing for CPU
+    async with asyncio.TaskGroup() as tg:
+        profile_task = tg.create_task(timer.run("profile", run_stage("profile", profile_request, req, fixture)))
+        rules_task = tg.create_task(timer.run("rules", run_stage("analyze", rule_optimizer.analyze, req.code)))
+    profile = profile_task.result()
+    report("profile", hotspots=profile)
+    rules = weight_findings(req.code, rules_task.result(), profile)
+    report("analyze", rules_detected=rules)
+
+    regions = select_hot_regions(req.code, profile) if req.pgo else []
+    if regions:
+        transform = run_stage("transform", transform_regions, req.code, regions, rule_optimizer)
+        optimized, transformations, _ = await timer.run("transform", transform)
+    else:
+        transform = run_stage("transform", apply_rule_based_optimizations, req.code, rules)
+        optimized, transformations = await timer.run("transform", transform)
     
     try:
         ast.parse(optimized)
     except SyntaxError:
         optimized = req.code
-    
-    original_bench = robust_benchmark(req.code, runs=3)
-    optimized_bench = robust_benchmark(optimized, runs=3)
-    
-    speedup = 1.0
-    if original_bench and optimized_bench:
-        speedup = original_bench['runtime_ms'] / optimized_bench['runtime_ms']
+    report("transform", optimized_code=optimized, transformations=transformations)
+
+    pgo = pgo_summary(req.code, regions) if regions else None
+    equivalence = await timer.run("equivalence", run_stage("equivalence", verify_candidate, req, optimized, fixture))
+    report("equivalence", equivalence=equivalence)
+    if not equivalence["equivalent"]:
+        return rejected_response("RULES_ONLY", req, optimized, equivalence, rules_detected=rules,
+                                 transformations=transformations, hotspots=profile, pgo=pgo,
+                                 timings=timer.summary())
+
+    benchmarks, speedup = await timer.run("benchmark", run_stage(
+        "benchmark", run_benchmarks, req.code, optimized, fixture, req.function_args, req.scaling
+    ))
+    report("benchmark", benchmarks=benchmarks)
 
     return {
         "mode": "RULES_ONLY",
@@ -43,76 +388,120 @@ async def optimize_rules_only(req: CodeRequest):
         "optimized_code": optimized,
         "rules_detected": rules,
         "transformations": transformations,
-        "benchmarks": {
-            "original": original_bench,
-            "optimized": optimized_bench,
-            "speedup_factor": round(speedup, 2)
-        },
+        "hotspots": profile,
+        "pgo": pgo,
+        "equivalence": equivalence,
+        "benchmarks": benchmarks,
+        "timings": timer.summary(),
         "timestamp": datetime.now().isoformat()
     }
 
+
+@app.post("/optimize-rules-only")
+async def optimize_rules_only(req: CodeRequest, caller: Dict = Depends(identify_caller),
+                              options: Dict = Depends(response_options)):
+    async with admitted(caller, "fast"):
+        return respond(await rules_only_pipeline(req), options)
+
 # ---------------- OFFLINE (SIMPLE) ----------------
 @app.post("/optimize-rules-only/simple")
-async def optimize_rules_only_simple(req: CodeRequest):
-    rules = rule_optimizer.analyze(req.code)
-    optimized, _ = apply_rule_based_optimizations(req.code, rules)
+async def optimize_rules_only_simple(req: CodeRequest, options: Dict = Depends(response_options)):
+    rules = await run_stage("analyze", rule_optimizer.analyze, req.code)
+    optimized, _ = await run_stage("transform", apply_rule_based_optimizations, req.code, rules)
     
     try:
         ast.parse(optimized)
     except SyntaxError:
         optimized = req.code
 
-    return {
+    return respond({
         "original_code": req.code,
         "optimized_code": optimized
-    }
+    }, options)
 
 
 # ---------------- ONLINE (HYBRID) ----------------
-@app.post("/optimize")
-async def optimize_hybrid(req: CodeRequest):
-    rules = rule_optimizer.analyze(req.code)
-    semantic_patterns = semantic_detector.find_semantic_patterns(req.code)   #get semantic patterns
-    rules = rules + semantic_patterns     #combine both
+@result_cached("hybrid")
+async def hybrid_pipeline(req: CodeRequest, report=no_report):
+    if not llm_available():
+        # Offline: no AI provider configured, so serve the rules engine
+        result = await rules_only_pipeline(req, report)
+        return {**result, "degraded": True, "degraded_reason": "No LLM provider configured"}
 
+    timer = StageTimer()
+    with timer.measure("parse"):
+        check_syntax(req.code)
+    fixture = request_fixture(req)
+    # Profile, rules and semantic detection are independent; findings (and
+    # the LLM hints) are then ordered by measured cost
+    async with asyncio.TaskGroup() as tg:
+        profile_task = tg.create_task(timer.run("profile", run_stage("profile", profile_request, req, fixture)))
+        rules_task = tg.create_task(timer.run("rules", run_stage("analyze", rule_optimizer.analyze, req.code)))
+        semantic_task = tg.create_task(timer.run(
+            "semantic", run_stage("semantic", semantic_detector.find_semantic_patterns, req.code)
+        ))
+    profile = profile_task.result()
+    report("profile", hotspots=profile)
+    rules = weight_findings(req.code, rules_task.result() + semantic_task.result(), profile)     #combine both
+    report("analyze", rules_detected=rules)
+
+    # PGO: rules + LLM see only the hot regions, results are spliced back
+    regions = select_hot_regions(req.code, profile) if req.pgo else []
 
-    
     try:
-        optimized = await optimize_with_gemini(req.code, hints=rules)
+        if regions:
+            transform = run_stage("transform", transform_regions, req.code, regions, rule_optimizer)
+            _, _, region_results = await timer.run("transform", transform)
+            optimized = await timer.run("llm_optimize", llm_optimize_regions(req.code, region_results, rules, optimize_with_gemini))
+        else:
+            optimized = await timer.run("llm_optimize", optimize_with_gemini(req.code, hints=rules))
     except Exception as e:
         raise HTTPException(500, detail=str(e))
+    report("llm", optimized_code=optimized)
+
+    # Reject behaviour changes before paying for full benchmarking
+    pgo = pgo_summary(req.code, regions) if regions else None
+    equivalence = await timer.run("equivalence", run_stage("equivalence", verify_candidate, req, optimized, fixture))
+    report("equivalence", equivalence=equivalence)
+    if not equivalence["equivalent"]:
+        return rejected_response("HYBRID", req, optimized, equivalence, rules_detected=rules,
+                                 hotspots=profile, pgo=pgo, timings=timer.summary())
+
+    benchmarks, speedup = await timer.run("benchmark", run_stage(
+        "benchmark", run_benchmarks, req.code, optimized, fixture, req.function_args, req.scaling
+    ))
+    report("benchmark", benchmarks=benchmarks)
+    original_bench = benchmarks['original']
+    optimized_bench = benchmarks['optimized']
     
-    original_bench = robust_benchmark(req.code, runs=3)
-    optimized_bench = robust_benchmark(optimized, runs=3)
-    
-    speedup = 1.0
     variance_pct = 0.0
     mem_before = 0.0
     mem_after = 0.0
     
     if original_bench and optimized_bench:
-        speedup = original_bench['runtime_ms'] / optimized_bench['runtime_ms']
         variance_pct = original_bench.get('variance_pct', 0.0)
         mem_before = original_bench['memory_mb']
         mem_after = optimized_bench['memory_mb']
     
-    # Safety validation
-    from safety import SafetyGuard
-    safety_guard = SafetyGuard()
-    safety_analysis = safety_guard.validate(
-        req.code, optimized, speedup, mem_before, mem_after
-    )
-    
-    # Confidence scoring
-    from metrics import calculate_confidence, generate_explainability
-    confidence = calculate_confidence(rules, speedup, variance_pct)
-    
-    # Explainability
-    explainability = generate_explainability(req.code, optimized, speedup, rules)
-
-    # AI Explanation
-    ai_explanation = await generate_ai_explanation(req.code, optimized, rules, speedup)
-
+    # Safety, confidence and explainability overlap with the AI explanation
+    async with asyncio.TaskGroup() as tg:
+        safety_task = tg.create_task(timer.run("safety", run_stage(
+            "safety", SafetyGuard().validate,
+            req.code, optimized, speedup, mem_before, mem_after, original_bench, optimized_bench
+        )))
+        confidence_task = tg.create_task(timer.run("confidence", run_stage(
+            "safety", calculate_confidence, rules, speedup, variance_pct, original_bench, optimized_bench
+        )))
+        explainability_task = tg.create_task(timer.run("explainability", run_stage(
+            "safety", generate_explainability, req.code, optimized, speedup, rules
+        )))
+        ai_task = tg.create_task(timer.run("explain", generate_ai_explanation(req.code, optimized, rules, speedup)))
+    safety_analysis = safety_task.result()
+    confidence = confidence_task.result()
+    explainability = explainability_task.result()
+    report("safety", safety_analysis=safety_analysis, confidence=confidence, explainability=explainability)
+    ai_explanation = ai_task.result()
+    report("explanation", ai_explanation=ai_explanation)
 
     return {
         "mode": "HYBRID",
@@ -120,27 +509,186 @@ async def optimize_hybrid(req: CodeRequest):
         "original_code": req.code,
         "optimized_code": optimized,
         "rules_detected": rules,
-        "benchmarks": {
-            "original": original_bench,
-            "optimized": optimized_bench,
-            "speedup_factor": round(speedup, 2)
-        },
+        "hotspots": profile,
+        "pgo": pgo,
+        "benchmarks": benchmarks,
         "safety_analysis": safety_analysis,
+        "equivalence": equivalence,
         "confidence": confidence,
         "explainability": explainability,
         "ai_explanation": ai_explanation,
+        "timings": timer.summary(),
         "timestamp": datetime.now().isoformat()
     }
 
 
+@app.post("/optimize")
+async def optimize_hybrid(req: CodeRequest, caller: Dict = Depends(identify_caller),
+                          options: Dict = Depends(response_options)):
+    async with admitted(caller, lane_for(req, "hybrid")):
+        return respond(await hybrid_pipeline(req), options)
+
+
+# ---------------- BATCH ----------------
+class BatchItem(CodeRequest):
+    # Echoed back on the item's result line, e.g. a file path
+    id: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    concurrency: Optional[int] = Field(None, ge=1, le=BATCH_MAX_CONCURRENCY)
+
+
+def batch_response(req: BatchRequest, pipeline, mode: str, caller: Dict, fields: Optional[List[str]] = None):
+    """NDJSON stream: one line per item as it finishes, then a summary line."""
+    items = [CodeRequest(**item.model_dump(exclude={"id"})) for item in req.items]
+    lanes = [lane_for(item, mode) for item in items]
+    # The whole batch is charged up front; its items then queue for lane slots
+    # like any other request (without the queue bound, so a batch can't reject itself).
+    # Unbounded waiters don't count towards the bound, and each batch keeps at most a
+    # lane's concurrency worth of items in it, so a batch can't fill a lane's queue.
+    try:
+        admission.charge(caller["user"], caller["role"], sum(admission.costs[lane] for lane in lanes))
+    except Saturated as e:
+        registry.inc("admission_rejected_total", "Requests refused with 429", {"lane": "batch"})
+        raise too_busy(e)
+
+    in_lane = {name: asyncio.Semaphore(lane.concurrency) for name, lane in admission.lanes.items()}
+
+    async def run(entry):
+        item, lane = entry
+        async with in_lane[lane], admitted(caller, lane, cost=0, bounded=False):
+            return project(await pipeline(item), fields)
+
+    return StreamingResponse(
+        stream_batch(list(zip(items, lanes)), run, req.concurrency, ids=[item.id for item in req.items]),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.post("/optimize/batch")
+async def optimize_batch(req: BatchRequest, caller: Dict = Depends(identify_caller), fields: Optional[str] = None):
+    return batch_response(req, hybrid_pipeline, "hybrid", caller, parse_fields(fields))
+
+
+@app.post("/optimize-rules-only/batch")
+async def optimize_rules_only_batch(req: BatchRequest, caller: Dict = Depends(identify_caller),
+                                    fields: Optional[str] = None):
+    return batch_response(req, rules_only_pipeline, "rules_only", caller, parse_fields(fields))
+
+
+# ---------------- JOBS ----------------
+job_manager = JobManager({"hybrid": hybrid_pipeline, "rules_only": rules_only_pipeline})
+
+
+class JobRequest(CodeRequest):
+    mode: Literal["hybrid", "rules_only"] = "hybrid"
+
+
+def _get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Job not found or expired")
+    return job
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(req: JobRequest, caller: Dict = Depends(identify_caller)):
+    # Jobs run on JOB_WORKERS; admission bounds the backlog and orders it (admins first)
+    if job_manager.queued >= JOB_MAX_QUEUED:
+        registry.inc("admission_rejected_total", "Requests refused with 429", {"lane": "jobs"})
+        raise too_busy(Saturated("Job queue is full", admission.lanes["heavy"].retry_after()))
+    request = CodeRequest(**req.model_dump(exclude={"mode"}))
+    try:
+        admission.charge(caller["user"], caller["role"], admission.costs[lane_for(request, req.mode)])
+    except Saturated as e:
+        registry.inc("admission_rejected_total", "Requests refused with 429", {"lane": "jobs"})
+        raise too_busy(e)
+    job = job_manager.submit(req.mode, request, priority=admission.priority(caller["role"]))
+    return {"job_id": job.id, "status": job.status, "events": f"/jobs/{job.id}/events"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, options: Dict = Depends(response_options)):
+    """fields= applies to the finished job's result."""
+    snapshot = _get_job(job_id).snapshot()
+    if snapshot.get("result") is not None:
+        snapshot["result"] = project(snapshot["result"], options["fields"])
+    return encode(snapshot, options["media_type"])
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    job = _get_job(job_id)
+    return StreamingResponse(
+        job_manager.stream(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ---------------- FILE UPLOAD ----------------
 @app.post("/upload")
-async def upload_code(file: UploadFile = File(...)):
+async def upload_code(file: UploadFile = File(...), workload: Optional[UploadFile] = File(None),
+                      caller: Dict = Depends(identify_caller), options: Dict = Depends(response_options)):
     if not file.filename.endswith('.py'):
         raise HTTPException(400, detail="Only .py files allowed")
     
     code = (await file.read()).decode("utf-8")
-    return await optimize_hybrid(CodeRequest(code=code))
+    # Optional second file is fed to the program as stdin during benchmarking
+    workload_config = None
+    if workload is not None:
+        workload_config = WorkloadConfig(stdin=(await workload.read()).decode("utf-8"))
+    return await optimize_hybrid(CodeRequest(code=code, workload=workload_config), caller, options)
+
+# ---------------- METRICS ----------------
+@registry.collector
+def queue_gauges():
+    gauges = [
+        ("jobs_queued", "Jobs waiting for a worker", {}, job_manager.queued),
+        ("requests_in_flight", "Distinct optimize computations running", {}, inflight.in_flight),
+    ]
+    for name, lane in admission.lanes.items():
+        gauges.append(("admission_running", "Requests holding a lane slot", {"lane": name}, lane.running))
+        gauges.append(("admission_waiting", "Requests queued for a lane slot", {"lane": name}, lane.waiting))
+    for stage, stats in get_executor().stats.items():
+        gauges.append(("stage_queue_depth", "Stage calls waiting for a slot", {"stage": stage}, stats["waiting"]))
+        gauges.append(("stage_running", "Stage calls running", {"stage": stage}, stats["running"]))
+    if SANDBOX_ENABLED:
+        gauges.append(("sandbox_jobs", "Sandboxed jobs run", {}, get_sandbox().stats["jobs"]))
+    return gauges
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/summary")
+async def metrics_summary():
+    """The /metrics figures as JSON (histograms with count/mean/p50/p95), for the admin dashboard."""
+    return registry.snapshot()
+
+# ---------------- ADMIN: TRACES ----------------
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if ADMIN_TOKEN and not is_admin_token(x_admin_token):
+        raise HTTPException(403, detail="Admin token required")
+
+@app.get("/admin/traces", dependencies=[Depends(require_admin)])
+async def list_traces(limit: int = 50, min_duration_ms: float = 0, name: Optional[str] = None):
+    """Recent traces (newest first), e.g. ?min_duration_ms=5000 for the slow ones."""
+    return {
+        "sample_rate": tracer.sample_rate,
+        "traces": tracer.recent(min(limit, tracer.buffer_size), min_duration_ms, name)
+    }
+
+@app.get("/admin/traces/{trace_id}", dependencies=[Depends(require_admin)])
+async def get_trace(trace_id: str):
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(404, detail="Trace not found (not sampled or evicted)")
+    return trace
 
 # ---------------- HEALTH ----------------
 @app.get("/")
@@ -151,6 +699,21 @@ async def root():
         "version": "1.0"
     }
 
+@app.get("/ready")
+async def ready(require_model: bool = False):
+    """Readiness: rules-only is served immediately; the semantic model may still be loading."""
+    model = semantic_detector.status()
+    body = {
+        "ready": model["state"] == "ready" or not require_model,
+        "llm_available": llm_available(),
+        "stages": get_executor().stats,
+        "coalescing": {"in_flight": inflight.in_flight, **inflight.stats},
+        "admission": admission.snapshot(),
+        "semantic_model": model,
+        "sandbox": {"enabled": SANDBOX_ENABLED, **(get_sandbox().stats if SANDBOX_ENABLED else {})}
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("jeremy_final:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,83 @@
+# job_client.py
+import os
+import time
+from typing import Dict
+import requests
+import streamlit as st
+from config import ADMIN_TOKEN
+from identity import issue_token
+
+API_URL = os.getenv("CODEFORGE_API_URL", "http://localhost:8000")
+API_TIMEOUT = 30
+JOB_POLL_SECONDS = 1.0
+
+
+class JobClient:
+    """Calls to the backend's /jobs endpoints (submit, then poll)."""
+
+    def __init__(self, base_url: str = None, timeout: float = None):
+        self.base_url = (base_url or API_URL).rstrip("/")
+        self.timeout = timeout or API_TIMEOUT
+
+    def _headers(self) -> Dict:
+        """Identify the logged-in user, so rate limits apply per user rather than to this server's address."""
+        user = st.session_state.get("auth", {}).get("user") or {}
+        headers = {}
+        token = issue_token(user["username"], user.get("role", "user")) if user.get("username") else None
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        if user.get("role") == "admin" and ADMIN_TOKEN:
+            headers["X-Admin-Token"] = ADMIN_TOKEN
+        return headers
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict:
+        try:
+            response = requests.request(method, f"{self.base_url}{path}", headers=self._headers(),
+                                        timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            return {"status": "ERROR", "error": f"Could not reach {self.base_url}: {e}"}
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if not response.ok:
+            return {"status": "ERROR", "error": body.get("detail") or f"HTTP {response.status_code}"}
+        return body
+
+    def submit_job(self, code: str, mode: str = "hybrid") -> Dict:
+        """POST /jobs; returns {"job_id", "status", "events"} or {"status": "ERROR", "error"}."""
+        return self._request("POST", "/jobs", json={"code": code, "mode": mode})
+
+    def get_job(self, job_id: str) -> Dict:
+        """GET /jobs/{job_id}; a failed request reads as a failed job so polling stops."""
+        snapshot = self._request("GET", f"/jobs/{job_id}")
+        if snapshot.get("status") == "ERROR":
+            return {"status": "failed", "error": snapshot["error"]}
+        return snapshot
+
+
+job_client = JobClient()
+
+
+def run_job(code: str, mode: str, label: str) -> dict:
+    """Submit a pipeline job and poll it, listing stages as they complete."""
+    job = job_client.submit_job(code, mode=mode)
+    if not job.get("job_id"):
+        return job
+    snap = {}
+    with st.status(label, expanded=False) as progress:
+        seen = set()
+        while True:
+            snap = job_client.get_job(job["job_id"])
+            for stage in snap.get("stages_completed", []):
+                if stage not in seen:
+                    seen.add(stage)
+                    progress.write(f"✓ {stage}")
+            if snap.get("status") in ("done", "failed"):
+                break
+            time.sleep(JOB_POLL_SECONDS)
+        progress.update(state="complete" if snap.get("status") == "done" else "error")
+    if snap.get("status") != "done":
+        return {"status": "ERROR", "error": snap.get("error")}
+    result = snap.get("result") or {}
+    return {**result, "status": "SUCCESS" if result.get("status", "success") == "success" else result["status"].upper()}
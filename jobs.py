@@ -0,0 +1,183 @@
+# jobs.py
+import asyncio
+import contextvars
+import itertools
+import json
+import logging
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from config import JOB_WORKERS, JOB_TTL, JOB_MAX_STORED
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# report(stage, **partial_results) is how a pipeline publishes progress
+Reporter = Callable[..., None]
+Pipeline = Callable[[Any, Reporter], Awaitable[Dict]]
+
+
+def no_report(stage: str, **partial):
+    """Reporter for direct (non-job) requests."""
+    return None
+
+
+class Job:
+    def __init__(self, mode: str, request: Any):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.request = request
+        self.status = QUEUED
+        self.stage = None
+        self.partial: Dict[str, Any] = {}
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict] = []
+        self.created = time.time()
+        self.updated = self.created
+        self._changed = asyncio.Event()
+
+    def record(self, event: str, **data):
+        self.events.append({"event": event, "time": time.time(), **data})
+        self.updated = time.time()
+        # Wake every stream waiting on this job, then re-arm
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def snapshot(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "mode": self.mode,
+            "status": self.status,
+            "stage": self.stage,
+            "stages_completed": [e["stage"] for e in self.events if e["event"] == "stage"],
+            "partial": self.partial,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "updated": self.updated
+        }
+
+
+class JobManager:
+    """
+    In-memory job queue for the optimization pipelines.
+
+    submit() returns immediately; JOB_WORKERS asyncio workers run queued
+    jobs through the pipeline registered for their mode. Pipelines call
+    report(stage, **partial) after each stage, which updates the job's
+    partial results and wakes any SSE streams. Finished jobs are kept for
+    JOB_TTL seconds (at most JOB_MAX_STORED).
+    """
+
+    def __init__(self, pipelines: Dict[str, Pipeline], workers: int = None):
+        self.pipelines = pipelines
+        self.workers = workers or JOB_WORKERS
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        """Start the workers; must be called from the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        # Fresh contexts: workers outlive the request that started them (and its trace)
+        self._tasks = [
+            asyncio.create_task(self._worker(), context=contextvars.Context()) for _ in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _purge(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.updated > JOB_TTL
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        # Oldest finished jobs go first when over capacity
+        overflow = len(self._jobs) - JOB_MAX_STORED
+        if overflow > 0:
+            finished = sorted((j for j in self._jobs.values() if j.finished), key=lambda j: j.updated)
+            for job in finished[:overflow]:
+                del self._jobs[job.id]
+
+    def submit(self, mode: str, request: Any, priority: int = 1) -> Job:
+        """Queue a job; lower priority values run first (0 = admin), FIFO within a priority."""
+        if mode not in self.pipelines:
+            raise ValueError(f"Unknown job mode: {mode}")
+        self.start()
+        self._purge()
+        job = Job(mode, request)
+        self._jobs[job.id] = job
+        job.record("queued", position=self._queue.qsize())
+        self._queue.put_nowait((priority, next(self._seq), job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.record("started")
+        start = time.perf_counter()
+
+        def report(stage: str, **partial):
+            job.stage = stage
+            job.partial.update(partial)
+            job.record("stage", stage=stage, elapsed_ms=round((time.perf_counter() - start) * 1000, 2),
+                       keys=sorted(partial))
+
+        try:
+            job.result = await self.pipelines[job.mode](job.request, report)
+            job.status = DONE
+            job.record("done", elapsed_ms=round((time.perf_counter() - start) * 1000, 2))
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            job.status = FAILED
+            job.error = getattr(e, "detail", None) or f"{type(e).__name__}: {e}"
+            job.record("failed", error=job.error)
+
+    async def stream(self, job: Job) -> AsyncIterator[str]:
+        """Server-sent events for a job: every recorded event, then the final snapshot."""
+        sent = 0
+        while True:
+            changed = job._changed
+            while sent < len(job.events):
+                event = job.events[sent]
+                sent += 1
+                yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+            if job.finished:
+                yield f"event: result\ndata: {json.dumps(job.snapshot(), default=str)}\n\n"
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
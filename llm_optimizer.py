@@ -2,12 +2,8 @@
 import ast
 import asyncio
 from typing import List, Dict, Optional
-from google import genai
-from google.genai import types
-from config import GEMINI_API_KEY, MODEL_NAME, API_TIMEOUT
-
-
-client = genai.Client(api_key=GEMINI_API_KEY)
+from config import API_TIMEOUT
+from llm_provider import generate_text
 
 
 async def optimize_with_gemini(code: str, hints: Optional[List[Dict]] = None) -> str:
@@ -31,22 +27,7 @@ Optimize this code for performance.
 Return ONLY the optimized Python code. No explanations, no markdown fences."""
 
     try:
-        response = await asyncio.wait_for(
-    asyncio.to_thread(
-        lambda: client.models.generate_content(
-            model=MODEL_NAME,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.2
-            )
-        )
-    ),
-    timeout=API_TIMEOUT
-)
-
-
-
-        optimized = response.text.strip()
+        optimized = (await generate_text(prompt, temperature=0.2)).strip()
         
         # Clean markdown fences
         for marker in ["```python", "```"]:
@@ -0,0 +1,96 @@
+# llm_provider.py
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Type
+from config import LLM_PROVIDER, GEMINI_API_KEY, MODEL_NAME, API_TIMEOUT
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(Exception):
+    """No provider is configured; callers fall back to the offline path."""
+
+
+class LLMProvider(ABC):
+    """
+    Text-generation backend for the AI layer. Implementations must not
+    import their SDK until the first generate() call, so the offline
+    rules engine never pays for it.
+    """
+    name = "base"
+
+    @abstractmethod
+    def generate(self, prompt: str, temperature: float = 0.2, thinking_budget: Optional[int] = None) -> str:
+        """Return the model's text for prompt."""
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str):
+        self.api_key = api_key
+        self.model = model
+        self._client = None
+        self._types = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from google import genai
+                from google.genai import types
+                self._client = genai.Client(api_key=self.api_key)
+                self._types = types
+        return self._client
+
+    def generate(self, prompt: str, temperature: float = 0.2, thinking_budget: Optional[int] = None) -> str:
+        client = self._get_client()
+        options = {"temperature": temperature}
+        if thinking_budget is not None:
+            options["thinking_config"] = self._types.ThinkingConfig(thinking_budget=thinking_budget)
+        response = client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._types.GenerateContentConfig(**options)
+        )
+        return response.text
+
+
+PROVIDERS: Dict[str, Type[LLMProvider]] = {"gemini": GeminiProvider}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> Optional[LLMProvider]:
+    """The configured provider, or None when running offline."""
+    global _provider
+    with _provider_lock:
+        if _provider is None and LLM_PROVIDER in PROVIDERS:
+            if LLM_PROVIDER == "gemini" and not GEMINI_API_KEY:
+                return None
+            _provider = PROVIDERS[LLM_PROVIDER](GEMINI_API_KEY, MODEL_NAME)
+        return _provider
+
+
+def llm_available() -> bool:
+    return get_provider() is not None
+
+
+async def generate_text(prompt: str, temperature: float = 0.2, thinking_budget: Optional[int] = None) -> str:
+    """Run the provider's blocking call off the event loop with API_TIMEOUT."""
+    provider = get_provider()
+    if provider is None:
+        raise LLMUnavailable("No LLM provider configured")
+    with span("llm.generate", provider=provider.name, model=getattr(provider, "model", None),
+              prompt_chars=len(prompt), temperature=temperature) as s:
+        text = await asyncio.wait_for(
+            asyncio.to_thread(provider.generate, prompt, temperature, thinking_budget),
+            timeout=API_TIMEOUT
+        )
+        if s:
+            s.set(response_chars=len(text or ""))
+        return text
@@ -1,8 +1,10 @@
 # metrics.py
-from typing import List, Dict
+from typing import List, Dict, Optional
 from difflib import unified_diff
+from config import PEAK_MEMORY_THRESHOLD, GC_PRESSURE_THRESHOLD
 
-def calculate_confidence(rules: List[Dict], speedup: float, variance_pct: float) -> Dict:
+def calculate_confidence(rules: List[Dict], speedup: float, variance_pct: float,
+                         bench_before: Optional[Dict] = None, bench_after: Optional[Dict] = None) -> Dict:
     """Calculate confidence score for optimization."""
     rule_score = min(len(rules) * 10, 40)
     
@@ -19,7 +21,20 @@ def calculate_confidence(rules: List[Dict], speedup: float, variance_pct: float)
         speedup_score = 5
     
     stability_score = max(20 - variance_pct, 5)
-    total = rule_score + speedup_score + stability_score
+
+    # Speedups that need more memory per call or spend more time in gc hold up worse under load
+    memory_penalty = 0
+    bench_before, bench_after = bench_before or {}, bench_after or {}
+    peak_before = bench_before.get("peak_bytes_per_call") or 0
+    peak_after = bench_after.get("peak_bytes_per_call") or 0
+    if peak_before > 0 and peak_after > peak_before:
+        memory_penalty -= 10 if peak_after > peak_before * PEAK_MEMORY_THRESHOLD else 5
+    gc_before = (bench_before.get("gc") or {}).get("gc_time_pct") or 0.0
+    gc_after = (bench_after.get("gc") or {}).get("gc_time_pct") or 0.0
+    if gc_after > gc_before + GC_PRESSURE_THRESHOLD:
+        memory_penalty -= 5
+
+    total = max(rule_score + speedup_score + stability_score + memory_penalty, 0)
     confidence = min(100, total)
     
     return {
@@ -27,7 +42,8 @@ def calculate_confidence(rules: List[Dict], speedup: float, variance_pct: float)
         "breakdown": {
             "rule_certainty": rule_score,
             "speedup_gain": round(speedup_score),
-            "benchmark_stability": round(stability_score)
+            "benchmark_stability": round(stability_score),
+            "memory_pressure": memory_penalty
         },
         "recommendation": (
             "APPLY" if confidence >= 75 else
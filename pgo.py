@@ -0,0 +1,121 @@
+# pgo.py
+import ast
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from config import PGO_COVERAGE, PGO_MAX_REGIONS, PGO_MIN_REGION_PCT
+from rule_transformer import apply_rule_based_optimizations
+
+# Top-level statements that can be cut out, optimized alone and spliced back
+_REGION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.For, ast.While, ast.With)
+
+
+def _region_start(node) -> int:
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def select_hot_regions(code: str, profile: Optional[Dict], coverage: float = None,
+                       max_regions: int = None) -> List[Dict]:
+    """
+    Pick the top-level functions and loops that account for most of the
+    profiled runtime, hottest first, until `coverage` percent is reached.
+    """
+    if coverage is None:
+        coverage = PGO_COVERAGE
+    if max_regions is None:
+        max_regions = PGO_MAX_REGIONS
+    if not profile or not profile.get("line_pct"):
+        return []
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+
+    line_pct = profile["line_pct"]
+    lines = code.splitlines()
+    candidates = []
+    for node in tree.body:
+        if not isinstance(node, _REGION_TYPES):
+            continue
+        start, end = _region_start(node), node.end_lineno
+        pct = sum(p for line, p in line_pct.items() if start <= line <= end)
+        if pct < PGO_MIN_REGION_PCT:
+            continue
+        candidates.append({
+            "kind": type(node).__name__,
+            "name": getattr(node, "name", None),
+            "start_line": start,
+            "end_line": end,
+            "time_pct": round(pct, 1),
+            "source": "\n".join(lines[start - 1:end])
+        })
+
+    candidates.sort(key=lambda r: r["time_pct"], reverse=True)
+    selected, covered = [], 0.0
+    for region in candidates:
+        if covered >= coverage or len(selected) >= max_regions:
+            break
+        selected.append(region)
+        covered += region["time_pct"]
+    return selected
+
+
+def splice_regions(code: str, replacements: List[Tuple[Dict, str]]) -> str:
+    """
+    Replace each region's lines with its new source. Regions whose new
+    source doesn't parse keep the original text; the result must parse or
+    the original code is returned.
+    """
+    lines = code.splitlines()
+    for region, new_source in sorted(replacements, key=lambda r: r[0]["start_line"], reverse=True):
+        try:
+            ast.parse(new_source)
+        except SyntaxError:
+            continue
+        lines[region["start_line"] - 1:region["end_line"]] = new_source.splitlines()
+
+    spliced = "\n".join(lines)
+    try:
+        ast.parse(spliced)
+    except SyntaxError:
+        return code
+    return spliced
+
+
+def _region_findings(findings: List[Dict], region: Dict) -> List[Dict]:
+    return [f for f in findings if region["start_line"] <= (f.get("line") or 0) <= region["end_line"]]
+
+
+def transform_regions(code: str, regions: List[Dict], analyzer) -> Tuple[str, List[Dict], List[Tuple[Dict, str]]]:
+    """
+    Run the rule analyzer and transformers on each region alone.
+    Returns (spliced code, transformations, per-region results).
+    """
+    results, transformations = [], []
+    for region in regions:
+        rules = analyzer.analyze(region["source"])
+        new_source, applied = apply_rule_based_optimizations(region["source"], rules)
+        # Report lines in the coordinates of the full module
+        transformations.extend({**t, "line": t["line"] + region["start_line"] - 1} for t in applied)
+        results.append((region, new_source))
+    return splice_regions(code, results), transformations, results
+
+
+async def llm_optimize_regions(code: str, region_results: List[Tuple[Dict, str]],
+                               findings: List[Dict], optimizer) -> str:
+    """Send each (already rule-transformed) hot region to the LLM concurrently and splice."""
+    async def one(region, source):
+        return region, await optimizer(source, hints=_region_findings(findings, region))
+
+    results = await asyncio.gather(*(one(region, source) for region, source in region_results))
+    return splice_regions(code, list(results))
+
+
+def pgo_summary(code: str, regions: List[Dict]) -> Dict:
+    sent = sum(len(r["source"]) for r in regions)
+    return {
+        "regions": [{k: v for k, v in r.items() if k != "source"} for r in regions],
+        "coverage_pct": round(sum(r["time_pct"] for r in regions), 1),
+        "chars_sent": sent,
+        "chars_total": len(code)
+    }
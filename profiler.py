@@ -0,0 +1,236 @@
+# profiler.py
+import ast
+import cProfile
+import pstats
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List, Optional
+from config import PROFILE_TOP_LINES
+from function_bench import is_definition_only, discover_functions, generate_arguments
+from utils import capture_stdout
+
+PROFILE_FILENAME = "<profile>"
+
+
+class _LineClock:
+    """Charges the time between consecutive line events to the earlier line."""
+
+    def __init__(self):
+        self.times = defaultdict(float)
+        self.hits = defaultdict(int)
+        self._line = None
+        self._last = 0.0
+
+    def tick(self, line: int):
+        now = time.perf_counter()
+        if self._line is not None:
+            self.times[self._line] += now - self._last
+        self.hits[line] += 1
+        self._line = line
+        self._last = time.perf_counter()
+
+    def stop(self):
+        if self._line is not None:
+            self.times[self._line] += time.perf_counter() - self._last
+            self._line = None
+
+
+def _run_monitoring(run, clock: _LineClock) -> bool:
+    """Line events through sys.monitoring (3.12+). False if unavailable."""
+    monitoring = getattr(sys, "monitoring", None)
+    if monitoring is None:
+        return False
+    tool = monitoring.PROFILER_ID
+    try:
+        monitoring.use_tool_id(tool, "codeforge")
+    except ValueError:
+        return False
+
+    def on_line(code, line):
+        if code.co_filename != PROFILE_FILENAME:
+            return monitoring.DISABLE
+        clock.tick(line)
+
+    monitoring.register_callback(tool, monitoring.events.LINE, on_line)
+    monitoring.set_events(tool, monitoring.events.LINE)
+    try:
+        run()
+    finally:
+        clock.stop()
+        monitoring.set_events(tool, 0)
+        monitoring.register_callback(tool, monitoring.events.LINE, None)
+        monitoring.free_tool_id(tool)
+    return True
+
+
+def _run_settrace(run, clock: _LineClock) -> bool:
+    """Line events through sys.settrace. False if another tracer is active."""
+    if sys.gettrace() is not None:
+        return False
+
+    def tracer(frame, event, arg):
+        if frame.f_code.co_filename != PROFILE_FILENAME:
+            return None
+        if event == "line":
+            clock.tick(frame.f_lineno)
+        return tracer
+
+    sys.settrace(tracer)
+    try:
+        run()
+    finally:
+        sys.settrace(None)
+        clock.stop()
+    return True
+
+
+def _run_cprofile(run, clock: _LineClock):
+    """Function-level fallback: charge each function's own time to its def line."""
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        run()
+    finally:
+        prof.disable()
+    for (filename, line, _), (cc, nc, tottime, _, _) in pstats.Stats(prof).stats.items():
+        if filename == PROFILE_FILENAME:
+            clock.times[line] += tottime
+            clock.hits[line] += nc
+
+
+def _workload(code: str, fixture=None, function_args=None):
+    """
+    Zero-arg callable that runs the module and, for definition-only modules,
+    calls each top-level function so the profile covers the real work.
+    """
+    compiled = compile(code, PROFILE_FILENAME, "exec")
+    call_functions = is_definition_only(code)
+    function_args = function_args or {}
+
+    def run():
+        namespace = {"__name__": "__main__"}
+        with capture_stdout():
+            if fixture is None:
+                exec(compiled, namespace)
+            else:
+                with fixture.activate(namespace):
+                    exec(compiled, namespace)
+            if call_functions:
+                for name, node in discover_functions(code).items():
+                    fn = namespace.get(name)
+                    if not callable(fn):
+                        continue
+                    args = function_args.get(name) or generate_arguments(node)
+                    try:
+                        fn(*args)
+                    except Exception:
+                        pass
+        return namespace
+    return run
+
+
+def profile_code(code: str, fixture=None, function_args=None, top: int = None) -> Optional[Dict]:
+    """
+    Profile one run of code: per-line time (sys.monitoring on 3.12+,
+    sys.settrace otherwise, cProfile if a tracer is already installed) and
+    per-line retained memory: a tracemalloc snapshot taken at the end of a
+    second run, so it counts what each line allocated and was still live
+    then, not temporaries freed along the way.
+    """
+    if top is None:
+        top = PROFILE_TOP_LINES
+    try:
+        run = _workload(code, fixture, function_args)
+    except SyntaxError:
+        return None
+
+    clock = _LineClock()
+    try:
+        if _run_monitoring(run, clock):
+            method = "sys.monitoring"
+        elif _run_settrace(run, clock):
+            method = "settrace"
+        else:
+            _run_cprofile(run, clock)
+            method = "cprofile"
+    except Exception as e:
+        return {"method": None, "error": f"{type(e).__name__}: {e}", "total_ms": 0.0, "hotspots": []}
+
+    # Snapshot while the run's namespace is still alive so its objects count
+    retained = defaultdict(int)
+    tracemalloc.start()
+    try:
+        namespace = run()
+        snapshot = tracemalloc.take_snapshot()
+        del namespace
+    except Exception:
+        snapshot = None
+    finally:
+        tracemalloc.stop()
+    if snapshot is not None:
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(True, PROFILE_FILENAME)])
+        for stat in snapshot.statistics("lineno"):
+            retained[stat.traceback[0].lineno] += stat.size
+
+    total = sum(clock.times.values())
+    source = code.splitlines()
+    lines = set(clock.times) | set(retained)
+    hotspots = [
+        {
+            "line": line,
+            "source": source[line - 1].strip() if 0 < line <= len(source) else "",
+            "time_ms": round(clock.times.get(line, 0.0) * 1000, 3),
+            "time_pct": round(clock.times.get(line, 0.0) / total * 100, 1) if total > 0 else 0.0,
+            "hits": clock.hits.get(line, 0),
+            "retained_kb": round(retained.get(line, 0) / 1024, 2)
+        }
+        for line in lines
+    ]
+    hotspots.sort(key=lambda h: (h["time_ms"], h["retained_kb"]), reverse=True)
+
+    return {
+        "method": method,
+        "total_ms": round(total * 1000, 3),
+        "notes": {"retained_kb": "memory still allocated at the end of the run, by the line that allocated it"},
+        "line_pct": {h["line"]: h["time_pct"] for h in hotspots},
+        "hotspots": hotspots[:top]
+    }
+
+
+def _finding_spans(code: str) -> Dict[int, int]:
+    """Start line -> furthest end line of any statement beginning there."""
+    spans = {}
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return spans
+    for node in ast.walk(tree):
+        if isinstance(node, ast.stmt) or isinstance(node, ast.expr):
+            end = getattr(node, "end_lineno", node.lineno) or node.lineno
+            spans[node.lineno] = max(spans.get(node.lineno, node.lineno), end)
+    return spans
+
+
+def weight_findings(code: str, findings: List[Dict], profile: Optional[Dict]) -> List[Dict]:
+    """
+    Attach the share of measured time spent in each finding's lines
+    (`measured_time_pct`) and order findings by it, costliest first.
+    """
+    if not profile or not profile.get("line_pct"):
+        return findings
+
+    line_pct = profile["line_pct"]
+    spans = _finding_spans(code)
+    for finding in findings:
+        start = finding.get("line") or 0
+        if start <= 0:
+            finding["measured_time_pct"] = 0.0
+            continue
+        end = spans.get(start, start)
+        finding["measured_time_pct"] = round(
+            sum(pct for line, pct in line_pct.items() if start <= line <= end), 1
+        )
+
+    return sorted(findings, key=lambda f: f["measured_time_pct"], reverse=True)
@@ -0,0 +1,87 @@
+# responses.py
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from fastapi.responses import Response
+from config import FIELD_PRESETS
+
+logger = logging.getLogger(__name__)
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON encoding
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: binary responses
+    msgpack = None
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """`fields=optimized_code,benchmarks.speedup_factor` or a preset name (FIELD_PRESETS)."""
+    if not fields:
+        return None
+    paths = []
+    for name in (f.strip() for f in fields.split(",")):
+        if name in FIELD_PRESETS:
+            paths.extend(FIELD_PRESETS[name])
+        elif name:
+            paths.append(name)
+    return paths
+
+
+def project(result: Any, paths: Optional[List[str]]) -> Any:
+    """Keep only the given dotted paths; paths missing from this result are skipped."""
+    if not paths or not isinstance(result, dict):
+        return result
+    out: Dict = {}
+    for path in paths:
+        keys = path.split(".")
+        value = result
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = out
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+                if not isinstance(target, dict):
+                    break
+            else:
+                target[keys[-1]] = value
+    return out
+
+
+def _default(value: Any):
+    # float/int subclasses (numpy scalars) stay numbers; anything else as json.dumps(default=str)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, int):
+        return int(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def dumps(body: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(body, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(body, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def wants_msgpack(format: Optional[str], accept: Optional[str]) -> bool:
+    return format == "msgpack" or (format is None and MSGPACK in (accept or ""))
+
+
+def encode(body: Any, media_type: str = JSON) -> Response:
+    if media_type == MSGPACK:
+        if msgpack is None:
+            logger.warning("msgpack requested but not installed; sending JSON")
+        else:
+            return Response(msgpack.packb(body, default=_default, use_bin_type=True), media_type=MSGPACK)
+    return Response(dumps(body), media_type=JSON)
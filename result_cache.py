@@ -0,0 +1,148 @@
+# result_cache.py
+import hashlib
+import importlib.util
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+from config import (
+    ENGINE_VERSION,
+    LLM_PROVIDER,
+    MODEL_NAME,
+    RESULT_CACHE_PATH,
+    RESULT_CACHE_SIZE,
+    RESULT_CACHE_TTL
+)
+from bench_cache import HARNESS_VERSION
+
+# Modules whose source shapes an /optimize response; editing any of them
+# (new rules, a different prompt, ...) changes the engine fingerprint.
+ENGINE_MODULES = [
+    "rules_engine", "rule_transformer", "llm_optimizer", "semantic_search", "pgo",
+    "equivalence", "safety", "metrics", "ai_explainer", "llm_provider", "profiler", "workloads",
+]
+
+
+def engine_fingerprint() -> str:
+    digest = hashlib.sha256(f"{ENGINE_VERSION}|{LLM_PROVIDER}|{MODEL_NAME}|{HARNESS_VERSION}".encode("utf-8"))
+    for name in ENGINE_MODULES:
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin:
+            continue
+        with open(spec.origin, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+class ResultCache:
+    """
+    Two-tier cache of whole /optimize responses: an in-memory LRU in
+    front of a SQLite table. Keys are a hash of the exact source text
+    plus mode, request options and the engine fingerprint, so rule,
+    prompt or model changes miss; rows from older engines are purged on
+    startup. Responses carry source (original, optimized and rejected
+    code, diffs, hot lines), so a reformatted submission is a miss here
+    and only reuses the AST-keyed benchmark and equivalence caches.
+    """
+
+    def __init__(self, path: str = None, size: int = None, ttl: int = None):
+        self.path = path or RESULT_CACHE_PATH
+        self.size = RESULT_CACHE_SIZE if size is None else size
+        self.ttl = RESULT_CACHE_TTL if ttl is None else ttl
+        self.engine = engine_fingerprint()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        if self.enabled:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, engine TEXT, created REAL, result TEXT)"
+                )
+                conn.execute("DELETE FROM results WHERE engine != ?", (self.engine,))
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def make_key(self, code: str, mode: str, options: Optional[Dict] = None) -> str:
+        parts = [hashlib.sha256(code.encode("utf-8")).hexdigest(), mode, self.engine, json.dumps(options or {}, sort_keys=True, default=repr)]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, created: float, result: Dict):
+        self._memory[key] = (created, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[1]
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT created, result FROM results WHERE key = ? AND engine = ?", (key, self.engine)
+                ).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                self.stats["misses"] += 1
+                return None
+            result = json.loads(row[1])
+            self._remember(key, row[0], result)
+            self.stats["disk_hits"] += 1
+            return result
+
+    def has(self, key: str) -> bool:
+        """Whether get() would hit, without touching stats or LRU order."""
+        if not self.enabled:
+            return False
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                return True
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT created FROM results WHERE key = ? AND engine = ?", (key, self.engine)
+                ).fetchone()
+            return row is not None and now - row[0] <= self.ttl
+
+    def put(self, key: str, result: Dict):
+        if not self.enabled or result is None:
+            return
+        created = time.time()
+        payload = json.dumps(result, default=str)
+        with self._lock:
+            # Store the JSON round-trip so memory and disk hits look the same
+            self._remember(key, created, json.loads(payload))
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, engine, created, result) VALUES (?, ?, ?, ?)",
+                    (key, self.engine, created, payload)
+                )
+
+    def clear(self) -> int:
+        with self._lock:
+            self._memory.clear()
+            if not self.enabled:
+                return 0
+            with self._connect() as conn:
+                return conn.execute("DELETE FROM results").rowcount
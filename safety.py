@@ -1,25 +1,33 @@
 # safety.py
 import ast
-from typing import Dict, List
+from typing import Dict, List, Optional
 from config import (
     MICRO_OPTIMIZATION_THRESHOLD,
     CODE_GROWTH_THRESHOLD,
     MEMORY_BLOAT_THRESHOLD,
-    COMPLEXITY_THRESHOLD
+    COMPLEXITY_THRESHOLD,
+    PEAK_MEMORY_THRESHOLD,
+    GC_PRESSURE_THRESHOLD
 )
 
+CHECK_COUNT = 5
+
 class SafetyGuard:
     """
     Validates optimizations to prevent harmful changes.
     """
     
     def validate(self, original: str, optimized: str, speedup: float,
-                 mem_before: float, mem_after: float) -> Dict:
+                 mem_before: float, mem_after: float,
+                 bench_before: Optional[Dict] = None, bench_after: Optional[Dict] = None) -> Dict:
         """
-        Check for 3 types of harmful optimizations:
+        Check for 5 types of harmful optimizations:
         1. Micro-optimization: Minimal speedup but more code
         2. Memory bloat: 50%+ increase
         3. Readability loss: 30%+ complexity increase
+        4. Peak memory per call: 50%+ higher high-water mark per benchmarked call
+        5. GC pressure: 5+ more percentage points of runtime in gc
+        Checks 4-5 need the benchmark results of both versions.
         """
         warnings = []
         
@@ -57,10 +65,33 @@ class SafetyGuard:
                 })
         except:
             pass
+
+        # Check 4: Peak memory per call
+        bench_before, bench_after = bench_before or {}, bench_after or {}
+        peak_before = bench_before.get("peak_bytes_per_call") or 0
+        peak_after = bench_after.get("peak_bytes_per_call") or 0
+        if peak_before > 0 and peak_after > peak_before * PEAK_MEMORY_THRESHOLD:
+            warnings.append({
+                "type": "peak_memory_per_call",
+                "severity": "MEDIUM",
+                "message": f"Needs {peak_after/peak_before:.1f}x more memory at its peak per call ({peak_before/1024:.1f}KB -> {peak_after/1024:.1f}KB)",
+                "recommendation": "WARN - higher peak memory per call adds up under concurrent load"
+            })
+
+        # Check 5: GC pressure
+        gc_before = (bench_before.get("gc") or {}).get("gc_time_pct")
+        gc_after = (bench_after.get("gc") or {}).get("gc_time_pct")
+        if gc_before is not None and gc_after is not None and gc_after - gc_before > GC_PRESSURE_THRESHOLD:
+            warnings.append({
+                "type": "gc_pressure",
+                "severity": "MEDIUM",
+                "message": f"Time in garbage collection rose from {gc_before:.1f}% to {gc_after:.1f}% of runtime",
+                "recommendation": "WARN - reduce long-lived container allocations in hot loops"
+            })
         
         return {
             "is_safe": len([w for w in warnings if w['severity'] == 'HIGH']) == 0,
             "warnings": warnings,
             "verdict": "SAFE TO APPLY" if len(warnings) == 0 else "REVIEW NEEDED",
-            "safe_count": 3 - len(warnings)
+            "safe_count": CHECK_COUNT - len(warnings)
         }
@@ -0,0 +1,306 @@
+# sandbox.py
+import errno
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from config import (
+    SANDBOX_ENABLED,
+    SANDBOX_START_METHOD,
+    SANDBOX_REUSE_WORKERS,
+    FORKSERVER_PRELOAD,
+    SANDBOX_WORKERS,
+    SANDBOX_WALL_TIMEOUT,
+    SANDBOX_CPU_TIMEOUT,
+    SANDBOX_MEMORY_MB,
+    SANDBOX_MAX_OUTPUT_BYTES
+)
+from utils import output_overflows
+
+try:
+    import resource
+except ImportError:  # Windows: only the wall-clock timeout applies
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Structured outcomes reported for every sandboxed job
+OK = "ok"
+TIMEOUT = "timeout"
+MEMORY_EXCEEDED = "memory_exceeded"
+OUTPUT_EXCEEDED = "output_exceeded"
+CRASHED = "crashed"
+
+
+def _apply_worker_limits(memory_mb: int, max_output: int):
+    """Process-wide limits, set once when a worker starts."""
+    # Raw writes to fd 1/2 would otherwise land in the server's logs
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    if resource is None:
+        return
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if max_output:
+        # Oversized file writes raise OSError(EFBIG) instead of killing us
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+        resource.setrlimit(resource.RLIMIT_FSIZE, (max_output, max_output))
+
+
+def _set_cpu_budget(seconds: float):
+    """Soft RLIMIT_CPU relative to what this worker has already used."""
+    if resource is None or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _output_exceeded(overflows_before: int) -> bool:
+    """Whether a job's captured output was cut at the limit since overflows_before."""
+    return output_overflows() > overflows_before
+
+
+def _worker_main(conn, memory_mb: int, max_output: int, workdir: str):
+    _apply_worker_limits(memory_mb, max_output)
+    # Files user code writes with relative paths land in a scratch directory, not the server's
+    sys.path[:] = [os.path.abspath(p) for p in sys.path]
+    os.chdir(workdir)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        fn, args, kwargs, cpu_seconds = message
+        _set_cpu_budget(cpu_seconds)
+        overflows = output_overflows()
+        try:
+            payload = pickle.dumps(fn(*args, **kwargs))
+            if _output_exceeded(overflows):
+                reply = (OUTPUT_EXCEEDED, None, f"Output exceeds {max_output} bytes")
+            elif len(payload) > max_output:
+                reply = (OUTPUT_EXCEEDED, None, f"Result of {len(payload)} bytes exceeds limit")
+            else:
+                reply = (OK, payload, None)
+        except MemoryError:
+            reply = (MEMORY_EXCEEDED, None, "MemoryError")
+        except OSError as e:
+            status = OUTPUT_EXCEEDED if e.errno == errno.EFBIG else CRASHED
+            reply = (status, None, f"{type(e).__name__}: {e}")
+        except BaseException as e:
+            reply = (CRASHED, None, f"{type(e).__name__}: {e}")
+        conn.send(reply)
+
+
+def _context(start_method: str):
+    """
+    multiprocessing context for workers. "forkserver" forks each worker
+    copy-on-write from a server that imported FORKSERVER_PRELOAD once, so a
+    fresh worker costs a fork instead of interpreter startup + imports.
+    """
+    if start_method not in multiprocessing.get_all_start_methods():
+        start_method = "spawn"
+    ctx = multiprocessing.get_context(start_method)
+    if start_method == "forkserver":
+        # Missing optional modules (numpy, pandas) are skipped by the server
+        ctx.set_forkserver_preload(FORKSERVER_PRELOAD)
+    return ctx
+
+
+class _Worker:
+    def __init__(self, ctx, memory_mb: int, max_output: int):
+        self.workdir = tempfile.mkdtemp(prefix="codeforge-sandbox-")
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child, memory_mb, max_output, self.workdir), daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def _exit_outcome(exitcode: Optional[int]) -> str:
+    if exitcode is not None and exitcode < 0:
+        sig = -exitcode
+        if sig == getattr(signal, "SIGXCPU", None):
+            return TIMEOUT
+        if sig == signal.SIGKILL:
+            # Most likely the kernel OOM killer
+            return MEMORY_EXCEEDED
+    return CRASHED
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of benchmark worker processes.
+
+    Each worker runs with an address-space rlimit, a file-size rlimit and
+    fd 1/2 sent to /dev/null; every job gets a wall-clock timeout and a CPU
+    budget. A worker that times out, dies or hits a limit is killed and
+    replaced, and the caller gets a structured outcome instead of a hang.
+    Jobs must be module-level functions with picklable arguments.
+
+    Unless reuse_workers is set, every job gets a fresh worker (no state
+    leaks between submissions); with the fork-server that costs a fork.
+    """
+
+    def __init__(self, size: int = None, memory_mb: int = None, max_output: int = None,
+                 start_method: str = None, reuse_workers: bool = None):
+        if size is None:
+            size = SANDBOX_WORKERS
+        if not size:
+            from scheduler import get_scheduler
+            size = len(get_scheduler().cores)
+        self.size = size
+        self.memory_mb = SANDBOX_MEMORY_MB if memory_mb is None else memory_mb
+        self.max_output = SANDBOX_MAX_OUTPUT_BYTES if max_output is None else max_output
+        self.start_method = start_method or SANDBOX_START_METHOD
+        self.reuse_workers = SANDBOX_REUSE_WORKERS if reuse_workers is None else reuse_workers
+        self._ctx = _context(self.start_method)
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.stats = {"jobs": 0, "replaced": 0, "workers_started": 0, "outcomes": {}}
+
+    def _new_worker(self) -> _Worker:
+        self.stats["workers_started"] += 1
+        return _Worker(self._ctx, self.memory_mb, self.max_output)
+
+    def warm(self):
+        """Start the fork-server (preloading modules) and fill the pool."""
+        with self._lock:
+            while self._created < self.size:
+                self._created += 1
+                self._idle.put(self._new_worker())
+
+    def _retire(self, worker: _Worker) -> _Worker:
+        """Swap a used worker for a fresh one so the next job starts clean."""
+        try:
+            worker.conn.send(None)
+        except OSError:
+            pass
+        worker.kill()
+        return self._new_worker()
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                return self._new_worker()
+        return self._idle.get()
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.kill()
+        self.stats["replaced"] += 1
+        return self._new_worker()
+
+    def call(self, fn: Callable, *args, timeout: float = None, cpu_seconds: float = None,
+             **kwargs) -> Dict[str, Any]:
+        """Run fn(*args, **kwargs) in a worker. Returns {status, value, error, elapsed_ms}."""
+        if timeout is None:
+            timeout = SANDBOX_WALL_TIMEOUT
+        if cpu_seconds is None:
+            cpu_seconds = min(SANDBOX_CPU_TIMEOUT, timeout)
+
+        start = time.perf_counter()
+        worker = self._checkout()
+        status, value, error = CRASHED, None, None
+        try:
+            try:
+                worker.conn.send((fn, args, kwargs, cpu_seconds))
+                if worker.conn.poll(timeout):
+                    status, payload, error = worker.conn.recv()
+                    value = pickle.loads(payload) if payload is not None else None
+                else:
+                    status, error = TIMEOUT, f"Exceeded {timeout}s wall-clock limit"
+                    worker = self._replace(worker)
+            except (EOFError, OSError, BrokenPipeError):
+                worker.process.join(timeout=1)
+                status = _exit_outcome(worker.process.exitcode)
+                error = f"Worker exited with code {worker.process.exitcode}"
+                worker = self._replace(worker)
+            else:
+                if status != OK and status != CRASHED:
+                    # A worker that hit a limit may be in a bad state
+                    worker = self._replace(worker)
+                elif not self.reuse_workers:
+                    worker = self._retire(worker)
+        finally:
+            self._idle.put(worker)
+
+        self.stats["jobs"] += 1
+        self.stats["outcomes"][status] = self.stats["outcomes"].get(status, 0) + 1
+        if status != OK:
+            logger.warning(f"Sandboxed {getattr(fn, '__name__', fn)} -> {status}: {error}")
+        return {
+            "status": status,
+            "value": value,
+            "error": error,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    def shutdown(self):
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.kill()
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_sandbox() -> SandboxPool:
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = SandboxPool()
+        return _default_pool
+
+
+def run_guarded(fn: Callable, *args, timeout: float = None, **kwargs) -> Tuple[Any, Dict]:
+    """
+    Run a benchmark-stage job in the sandbox (or in-process when
+    SANDBOX_ENABLED is off). Returns (value, outcome) where outcome is
+    {status, error, elapsed_ms}; value is None unless status is "ok".
+    """
+    if SANDBOX_ENABLED:
+        result = get_sandbox().call(fn, *args, timeout=timeout, **kwargs)
+    else:
+        start = time.perf_counter()
+        overflows = output_overflows()
+        try:
+            result = {"status": OK, "value": fn(*args, **kwargs), "error": None}
+            if _output_exceeded(overflows):
+                result = {"status": OUTPUT_EXCEEDED, "value": None,
+                          "error": f"Output exceeds {SANDBOX_MAX_OUTPUT_BYTES} bytes"}
+        except MemoryError:
+            result = {"status": MEMORY_EXCEEDED, "value": None, "error": "MemoryError"}
+        except Exception as e:
+            result = {"status": CRASHED, "value": None, "error": f"{type(e).__name__}: {e}"}
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    value = result.pop("value")
+    return value, result
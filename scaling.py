@@ -0,0 +1,214 @@
+# scaling.py
+import ast
+import math
+from typing import Dict, List, Optional
+from config import (
+    SCALING_SIZES,
+    SCALING_RUNS,
+    SCALING_MAX_SAMPLE_TIME,
+    SCALING_PRODUCTION_SIZE
+)
+from utils import robust_benchmark, benchmark_callable, capture_stdout
+from function_bench import (
+    discover_functions,
+    generate_arguments,
+    load_functions,
+    make_call_runner,
+    make_call_baseline
+)
+from workloads import WorkloadFixture, uses_stdin
+
+# log f(n) for each candidate growth curve; fitting in log space keeps
+# exponential models from overflowing at large n
+GROWTH_MODELS = {
+    "O(1)": lambda n: 0.0,
+    "O(log n)": lambda n: math.log(math.log2(n) + 1),
+    "O(n)": lambda n: math.log(n),
+    "O(n log n)": lambda n: math.log(n) + math.log(math.log2(n) + 1),
+    "O(n^2)": lambda n: 2 * math.log(n),
+    "O(n^3)": lambda n: 3 * math.log(n),
+    "O(2^n)": lambda n: n * math.log(2),
+}
+
+
+def substitute_size(code: str, size_var: str, size: int) -> str:
+    """
+    Set a module-level size variable to `size`: rewrite its top-level
+    assignment, or prepend one if the code never assigns it.
+    """
+    tree = ast.parse(code)
+    replaced = False
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == size_var for t in node.targets
+        ):
+            node.value = ast.Constant(size)
+            replaced = True
+    if not replaced:
+        tree.body.insert(0, ast.Assign(
+            targets=[ast.Name(id=size_var, ctx=ast.Store())],
+            value=ast.Constant(size)
+        ))
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+
+def fit_complexity(sizes: List[int], times_ms: List[float]) -> Optional[Dict]:
+    """
+    Fit t = c * f(n) for every growth model (least squares on log t) and
+    return the best model with its coefficient and residual.
+    """
+    points = [(n, t) for n, t in zip(sizes, times_ms) if n > 1 and t > 0]
+    if len(points) < 3:
+        return None
+
+    fits = {}
+    for model, log_f in GROWTH_MODELS.items():
+        logs = [(math.log(t), log_f(n)) for n, t in points]
+        log_c = sum(lt - lf for lt, lf in logs) / len(logs)
+        residual = sum((lt - lf - log_c) ** 2 for lt, lf in logs) / len(logs)
+        fits[model] = (log_c, residual)
+
+    best = min(fits, key=lambda m: fits[m][1])
+    return {
+        "model": best,
+        "log_coefficient": fits[best][0],
+        "residual": round(fits[best][1], 4),
+        "residuals": {m: round(r, 4) for m, (_, r) in fits.items()}
+    }
+
+
+def _log_projection(fit: Dict, size: int) -> float:
+    return fit['log_coefficient'] + GROWTH_MODELS[fit['model']](size)
+
+
+def _safe_exp(x: float) -> Optional[float]:
+    # Exponential fits at production sizes overflow a float (and JSON)
+    return math.exp(x) if x < 700 else None
+
+
+def project_time(fit: Dict, size: int) -> Optional[float]:
+    """Predicted runtime (ms) at `size` from a fit_complexity result, None if unbounded."""
+    return _safe_exp(_log_projection(fit, size))
+
+
+def estimate_static_complexity(code: str) -> str:
+    """Polynomial degree from the deepest loop nesting in the source."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return "unknown"
+
+    def depth(node):
+        inner = max((depth(c) for c in ast.iter_child_nodes(node)), default=0)
+        is_loop = isinstance(node, (ast.For, ast.While, ast.comprehension))
+        return inner + (1 if is_loop else 0)
+
+    d = depth(tree)
+    if d == 0:
+        return "O(1)"
+    if d == 1:
+        return "O(n)"
+    return f"O(n^{d})"
+
+
+def _measure(code: str, size: int, size_var, function, generator, runs, stdin_source):
+    """Benchmark one side at one size, None if the workload can't be set up or fails."""
+    try:
+        if function:
+            fns = load_functions(code)
+            if function not in fns:
+                return None
+            if generator:
+                hook = {}
+                with capture_stdout():
+                    exec(compile(generator, "<workload>", "exec"), hook)
+                args = list(hook["workload"](size))
+            else:
+                args = generate_arguments(discover_functions(code)[function], size=size)
+            return benchmark_callable(make_call_runner(fns[function], args), runs=runs,
+                                      baseline=make_call_baseline(args))
+
+        if size_var:
+            return robust_benchmark(substitute_size(code, size_var, size), runs=runs)
+
+        # Both sides read the stdin synthesized for the original program
+        fixture = WorkloadFixture.synthetic(stdin_source, size=size)
+        return robust_benchmark(code, runs=runs, fixture=fixture)
+    except Exception:
+        return None
+
+
+def benchmark_scaling(original: str, optimized: str, size_var: str = None,
+                      function: str = None, generator: str = None,
+                      sizes: List[int] = None, production_size: int = None,
+                      runs: int = None) -> Dict:
+    """
+    Benchmark both versions across a geometric series of input sizes, fit
+    empirical growth curves and project the speedup at production size.
+
+    The workload is a module-level `size_var` that is rewritten per size, a
+    top-level `function` called with arguments from a `generator` hook (code
+    defining `workload(n)` -> args) or generated ones, or, for programs that
+    read input(), synthetic stdin scaled to each size.
+    """
+    if not size_var and not function and not uses_stdin(original):
+        return {"error": "size_var or function is required"}
+    sizes = sorted(sizes or SCALING_SIZES)
+    production_size = production_size or SCALING_PRODUCTION_SIZE
+    runs = runs or SCALING_RUNS
+
+    points = []
+    prev = None
+    for size in sizes:
+        orig = _measure(original, size, size_var, function, generator, runs, original)
+        opt = _measure(optimized, size, size_var, function, generator, runs, original)
+        if not orig or not opt:
+            break
+        if orig['runtime_ms'] is None or opt['runtime_ms'] is None:
+            continue  # below timer resolution at this size; nothing to fit
+        points.append({
+            "size": size,
+            "original_ms": orig['runtime_ms'],
+            "optimized_ms": opt['runtime_ms'],
+            "speedup_factor": round(orig['runtime_ms'] / opt['runtime_ms'], 2)
+        })
+
+        # Stop before the next size blows the budget (extrapolate the last step)
+        slowest = max(orig['runtime_ms'], opt['runtime_ms']) / 1000
+        if prev:
+            growth = slowest / prev if prev > 0 else 1.0
+            if slowest * max(growth, 1.0) > SCALING_MAX_SAMPLE_TIME:
+                break
+        elif slowest > SCALING_MAX_SAMPLE_TIME:
+            break
+        prev = slowest
+
+    measured = [p['size'] for p in points]
+    orig_fit = fit_complexity(measured, [p['original_ms'] for p in points])
+    opt_fit = fit_complexity(measured, [p['optimized_ms'] for p in points])
+
+    projected = None
+    if orig_fit and opt_fit:
+        orig_ms = project_time(orig_fit, production_size)
+        opt_ms = project_time(opt_fit, production_size)
+        speedup = _safe_exp(_log_projection(orig_fit, production_size)
+                            - _log_projection(opt_fit, production_size))
+        projected = {
+            "size": production_size,
+            "original_ms": round(orig_ms, 3) if orig_ms is not None else None,
+            "optimized_ms": round(opt_ms, 3) if opt_ms is not None else None,
+            "speedup_factor": round(speedup, 2) if speedup is not None else None
+        }
+
+    return {
+        "points": points,
+        "original_complexity": orig_fit['model'] if orig_fit else None,
+        "optimized_complexity": opt_fit['model'] if opt_fit else None,
+        "static_complexity": {
+            "original": estimate_static_complexity(original),
+            "optimized": estimate_static_complexity(optimized)
+        },
+        "fits": {"original": orig_fit, "optimized": opt_fit},
+        "projected": projected,
+        "asymptotic_change": bool(orig_fit and opt_fit and orig_fit['model'] != opt_fit['model'])
+    }
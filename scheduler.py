@@ -0,0 +1,167 @@
+# scheduler.py
+import gc
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+from config import BENCH_CORES, BENCH_SLOT_TIMEOUT
+
+try:
+    import fcntl
+except ImportError:  # Windows: slots are only coordinated within this process
+    fcntl = None
+
+
+def _available_cores() -> List[int]:
+    if BENCH_CORES:
+        return BENCH_CORES
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _cpu_mhz(core: int) -> Optional[float]:
+    path = f"/sys/devices/system/cpu/cpu{core}/cpufreq/scaling_cur_freq"
+    try:
+        with open(path, "r") as f:
+            return round(int(f.read().strip()) / 1000, 1)
+    except (OSError, ValueError):
+        return None
+
+
+def _loadavg() -> Optional[float]:
+    try:
+        return round(os.getloadavg()[0], 2)
+    except (AttributeError, OSError):
+        return None
+
+
+class _GCQuiet:
+    """
+    Reference-counted gc.freeze/gc.disable: gc is process-wide, so it stays
+    off while any benchmark is timing and comes back when the last one ends.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+        self._was_enabled = True
+
+    def __enter__(self):
+        with self._lock:
+            if self._active == 0:
+                self._was_enabled = gc.isenabled()
+                gc.collect()
+                gc.freeze()
+                gc.disable()
+            self._active += 1
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                gc.unfreeze()
+                if self._was_enabled:
+                    gc.enable()
+
+
+class BenchmarkScheduler:
+    """
+    Gives each benchmark job a dedicated core.
+
+    Concurrency is capped at the number of cores: a job waits until a core
+    slot is free, pins the running thread to it with os.sched_setaffinity
+    (Linux affinity is per-thread), runs with gc frozen and disabled, and
+    gets the noise level it ran under attached to its result. Slots are
+    flock()ed files, so separate server processes share them too.
+    """
+
+    def __init__(self, cores: Optional[List[int]] = None, lock_dir: Optional[str] = None):
+        self.cores = cores or _available_cores()
+        self.lock_dir = lock_dir or os.path.join(tempfile.gettempdir(), "codeforge-bench")
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._local = threading.Semaphore(len(self.cores))
+        self._taken = set()
+        self._taken_lock = threading.Lock()
+        self._gc = _GCQuiet()
+
+    def _try_core(self, core: int):
+        with self._taken_lock:
+            if core in self._taken:
+                return None
+            self._taken.add(core)
+        if fcntl is None:
+            return core, None
+        f = open(os.path.join(self.lock_dir, f"core-{core}.lock"), "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            with self._taken_lock:
+                self._taken.discard(core)
+            return None
+        return core, f
+
+    def _release(self, core: int, handle):
+        if handle is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+        with self._taken_lock:
+            self._taken.discard(core)
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        """Hold a pinned core for the duration of the block; yields the noise record."""
+        if timeout is None:
+            timeout = BENCH_SLOT_TIMEOUT
+        start = time.perf_counter()
+        if not self._local.acquire(timeout=timeout):
+            raise TimeoutError("No benchmark core available")
+        try:
+            acquired = None
+            while acquired is None:
+                for core in self.cores:
+                    acquired = self._try_core(core)
+                    if acquired:
+                        break
+                if acquired is None:
+                    if time.perf_counter() - start > timeout:
+                        raise TimeoutError("No benchmark core available")
+                    time.sleep(0.01)
+            core, handle = acquired
+
+            previous = None
+            if hasattr(os, "sched_setaffinity"):
+                previous = os.sched_getaffinity(0)
+                os.sched_setaffinity(0, {core})
+            noise = {
+                "core": core,
+                "queued_ms": round((time.perf_counter() - start) * 1000, 2),
+                "loadavg_1m": _loadavg(),
+                "cpu_mhz_start": _cpu_mhz(core),
+                "pinned": previous is not None
+            }
+            try:
+                with self._gc:
+                    yield noise
+            finally:
+                noise["cpu_mhz_end"] = _cpu_mhz(core)
+                if previous is not None:
+                    os.sched_setaffinity(0, previous)
+                self._release(core, handle)
+        finally:
+            self._local.release()
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> BenchmarkScheduler:
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = BenchmarkScheduler()
+        return _default_scheduler
@@ -1,11 +1,32 @@
-from sentence_transformers import SentenceTransformer
 import ast
+import logging
+import threading
+import time
 import numpy as np
+from config import SEMANTIC_MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+# Model lifecycle states reported by status()
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
 
 class SemanticPatternDetector:
-    def __init__(self):
-        # Use a code-understanding model
-        self.model = SentenceTransformer('microsoft/codebert-base')
+    """
+    Embedding-based pattern matcher. The model (and sentence_transformers /
+    torch) is loaded on first use or by warm_in_background(), never at
+    construction, so importing the server stays cheap.
+    """
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or SEMANTIC_MODEL_NAME
+        self.model = None
+        self.pattern_embeddings = None
+        self.state = NOT_LOADED
+        self.error = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
         
         # Known inefficient patterns (embeddings will be computed once)
         self.inefficient_patterns = [
@@ -15,8 +36,39 @@ class SemanticPatternDetector:
             "for key in dict: if key == target: return dict[key]",
             "for i in range(len(list1)): for j in range(len(list2)): compare(list1[i], list2[j])"
         ]
-        
-        self.pattern_embeddings = self.model.encode(self.inefficient_patterns)
+
+    def load(self) -> bool:
+        """Load the model and pattern embeddings once; concurrent callers wait. Returns readiness."""
+        with self._lock:
+            if self.state in (READY, FAILED):
+                return self.state == READY
+            self.state = LOADING
+            start = time.perf_counter()
+            try:
+                from sentence_transformers import SentenceTransformer
+                # Use a code-understanding model
+                self.model = SentenceTransformer(self.model_name)
+                self.pattern_embeddings = self.model.encode(self.inefficient_patterns)
+                self.state = READY
+            except Exception as e:
+                logger.warning(f"Semantic model unavailable: {type(e).__name__}: {e}")
+                self.error = f"{type(e).__name__}: {e}"
+                self.state = FAILED
+            self.load_seconds = round(time.perf_counter() - start, 2)
+            return self.state == READY
+
+    def warm_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.load, name="semantic-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        return {
+            "model": self.model_name,
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "error": self.error
+        }
     
     def extract_code_blocks(self, code: str):
         """Extract loops and function bodies from code"""
@@ -37,6 +89,9 @@ class SemanticPatternDetector:
         blocks = self.extract_code_blocks(code)
         if not blocks:
             return []
+        # Without the model the hybrid pipeline just runs on AST rules
+        if not self.load():
+            return []
         
         # Encode code blocks
         block_embeddings = self.model.encode(blocks)
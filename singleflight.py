@@ -0,0 +1,41 @@
+# singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent identical work: the first caller for a key
+    starts the computation and later callers attach to it until it
+    finishes, all receiving the same result (or exception). The shared
+    task is shielded, so one caller disconnecting doesn't cancel it for
+    the others.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.stats = {"started": 0, "coalesced": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returns (result, shared); shared is True when attached to another caller's run."""
+        task = self._flights.get(key)
+        shared = task is not None
+        if shared:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.create_task(fn())
+            self._flights[key] = task
+            self.stats["started"] += 1
+
+            def done(t: asyncio.Task):
+                if self._flights.get(key) is t:
+                    del self._flights[key]
+                if not t.cancelled():
+                    t.exception()  # retrieved, so it isn't logged when every caller left
+
+            task.add_done_callback(done)
+        return await asyncio.shield(task), shared
@@ -0,0 +1,161 @@
+# telemetry.py
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from config import METRICS_BUCKETS, METRICS_PREFIX
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (what Prometheus would interpolate towards)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """
+    In-process counters, gauges and histograms, rendered in the Prometheus
+    text exposition format. Gauges that mirror other components' state
+    (queue depths, cache stats) are filled by collectors at scrape time.
+    """
+
+    def __init__(self, prefix: str = None, buckets: List[float] = None):
+        self.prefix = METRICS_PREFIX if prefix is None else prefix
+        self.buckets = sorted(buckets or METRICS_BUCKETS)
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, str, Dict, float]]]] = []
+        self._lock = threading.Lock()
+
+    def _name(self, name: str) -> str:
+        return f"{self.prefix}_{name}" if self.prefix else name
+
+    def inc(self, name: str, help: str, labels: Optional[Dict] = None, value: float = 1):
+        name = self._name(name)
+        with self._lock:
+            self._help.setdefault(name, ("counter", help))
+            series = self._counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, help: str, value: float, labels: Optional[Dict] = None):
+        name = self._name(name)
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help))
+            series = self._histograms.setdefault(name, {})
+            key = _labels(labels)
+            if key not in series:
+                series[key] = _Histogram(self.buckets)
+            series[key].observe(value)
+
+    def collector(self, fn: Callable[[], List[Tuple[str, str, Dict, float]]]):
+        """Register fn() -> [(name, help, labels, value), ...] gauges read at scrape time."""
+        self._collectors.append(fn)
+        return fn
+
+    def _collect(self) -> Dict[str, Dict[Labels, float]]:
+        gauges: Dict[str, Dict[Labels, float]] = {}
+        for fn in self._collectors:
+            for name, help, labels, value in fn():
+                name = self._name(name)
+                self._help.setdefault(name, ("gauge", help))
+                gauges.setdefault(name, {})[_labels(labels)] = value
+        return gauges
+
+    def render(self) -> str:
+        gauges = self._collect()
+        lines = []
+        with self._lock:
+            for name in sorted(self._help):
+                kind, help = self._help[name]
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    for labels, hist in sorted(self._histograms.get(name, {}).items()):
+                        cumulative = 0
+                        for bound, count in zip(hist.buckets + [float("inf")], hist.counts):
+                            cumulative += count
+                            lines.append(
+                                f"{name}_bucket{_format_labels(labels, ('le', _format_value(float(bound))))} {cumulative}"
+                            )
+                        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(hist.sum)}")
+                        lines.append(f"{name}_count{_format_labels(labels)} {hist.count}")
+                else:
+                    series = (self._counters if kind == "counter" else gauges).get(name, {})
+                    for labels, value in sorted(series.items()):
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """The same figures as JSON, with per-series count/mean/p50/p95 for histograms."""
+        gauges = self._collect()
+        with self._lock:
+            def flat(series):
+                return [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+
+            return {
+                "counters": {name: flat(series) for name, series in self._counters.items()},
+                "gauges": {name: flat(series) for name, series in gauges.items()},
+                "histograms": {
+                    name: [
+                        {
+                            "labels": dict(labels),
+                            "count": hist.count,
+                            "sum": round(hist.sum, 6),
+                            "mean": round(hist.sum / hist.count, 6) if hist.count else None,
+                            "p50": hist.quantile(0.5),
+                            "p95": hist.quantile(0.95)
+                        }
+                        for labels, hist in sorted(series.items())
+                    ]
+                    for name, series in self._histograms.items()
+                }
+            }
+
+
+registry = Registry()
+
+
+def observe_stage(stage: str, seconds: float, ok: bool = True):
+    registry.observe("stage_duration_seconds", "Pipeline stage latency", seconds, {"stage": stage})
+    if not ok:
+        registry.inc("stage_errors_total", "Pipeline stages that raised", {"stage": stage})
@@ -0,0 +1,35 @@
+from equivalence import check_equivalence
+from function_bench import benchmark_function_pairs
+
+# No `call` injected: cases run inline, which must accept the timeout= the checker passes
+different = check_equivalence("x = 1\nprint(x)", "x = 2\nprint(x)")
+print(f"x=1 vs x=2: equivalent={different['equivalent']}, checked={different['checked_inputs']}")
+for mismatch in different["mismatches"]:
+    print(f"  - {mismatch}")
+
+same = check_equivalence(
+    "def total(n):\n    s = 0\n    for i in range(n):\n        s += i\n    return s\n",
+    "def total(n):\n    return sum(range(n))\n"
+)
+print(f"loop vs sum(): equivalent={same['equivalent']}, checked={same['checked_inputs']}")
+
+
+def always_times_out(fn, *args, timeout=None, **kwargs):
+    return None, {"status": "timeout", "error": None}
+
+
+# Both sides timing out on every input proves nothing
+unchecked = check_equivalence("x = 1\nprint(x)", "x = 2\nprint(x)", call=always_times_out)
+print(f"all inputs timed out: equivalent={unchecked['equivalent']}, reason={unchecked.get('reason')}")
+
+functions = benchmark_function_pairs(
+    "def total(n):\n    s = 0\n    for i in range(n):\n        s += i\n    return s\n",
+    "def total(n):\n    return sum(range(n))\n",
+    runs=1
+)
+print(f"function benchmarks run inline: {[f['function'] for f in functions]}")
+
+assert not different["equivalent"] and different["checked_inputs"] > 0
+assert same["equivalent"] and same["checked_inputs"] > 0
+assert not unchecked["equivalent"] and unchecked["inconclusive"] and unchecked["checked_inputs"] == 0
+assert functions and functions[0]["original"] is not None
@@ -0,0 +1,19 @@
+from metrics import calculate_confidence
+from responses import parse_fields, project
+
+# A ?fields=compact projection of a result built by the real scorers
+result = {
+    "mode": "RULES_ONLY",
+    "status": "success",
+    "optimized_code": "total = sum(range(10))",
+    "benchmarks": {"speedup_factor": 2.0},
+    "equivalence": {"equivalent": True},
+    "safety_analysis": {"is_safe": True},
+    "confidence": calculate_confidence([{"rule": "loop_to_sum"}], 2.0, 3.0),
+}
+compact = project(result, parse_fields("compact"))
+print(f"compact fields: {sorted(compact)}")
+print(f"compact confidence: {compact.get('confidence')}")
+
+assert compact["confidence"]["overall"] == result["confidence"]["overall"]
+assert compact["benchmarks"]["speedup_factor"] == 2.0
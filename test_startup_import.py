@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+
+# Offline startup: importing the API must not need a Gemini key and must not
+# import the AI SDK or the embedding model stack.
+IMPORT_BUDGET_SECONDS = 3.0
+RUNS = 3
+HEAVY_MODULES = ["google.genai", "sentence_transformers", "torch", "transformers"]
+
+probe = f"""
+import json, sys, time
+start = time.perf_counter()
+import jeremy_final
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+    "llm_available": jeremy_final.llm_available()
+}}))
+"""
+
+env = {**os.environ, "GEMINI_API_KEY": "", "LLM_PROVIDER": "none"}
+here = os.path.dirname(os.path.abspath(__file__))
+
+results = []
+for _ in range(RUNS):
+    out = subprocess.run(
+        [sys.executable, "-c", probe], cwd=here, env=env, capture_output=True, text=True, check=True
+    )
+    results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+best = min(r["seconds"] for r in results)
+print(f"import jeremy_final: best {best:.3f}s of {RUNS} (budget {IMPORT_BUDGET_SECONDS}s)")
+print(f"heavy modules loaded: {results[0]['loaded'] or 'none'}")
+print(f"LLM available: {results[0]['llm_available']}")
+
+assert not results[0]["llm_available"], "No provider should be configured without a key"
+assert not results[0]["loaded"], f"Imported at startup: {results[0]['loaded']}"
+assert best <= IMPORT_BUDGET_SECONDS, f"Startup import took {best:.3f}s"
+print("OK")
@@ -0,0 +1,154 @@
+# tracing.py
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from config import TRACE_SAMPLE_RATE, TRACE_BUFFER_SIZE, TRACE_FILE
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "duration_ms", "attributes", "status")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.duration_ms = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Per-request traces of nested spans. The current span lives in a
+    contextvar, so spans nest across awaits, tasks and (with
+    copy_context) thread-pool stages; process-pool stages aren't traced
+    inside. Finished traces go to an in-memory ring buffer and,
+    if TRACE_FILE is set, one JSON line each to that file. Unsampled
+    requests cost a contextvar lookup per span.
+    """
+
+    def __init__(self, sample_rate: float = None, buffer_size: int = None, path: str = None):
+        self.sample_rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.buffer_size = buffer_size or TRACE_BUFFER_SIZE
+        self.path = TRACE_FILE if path is None else path
+        self._traces: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    @contextmanager
+    def span(self, name: str, root: bool = False, force: bool = False, **attributes):
+        """
+        Child span of the current one; yields None when not tracing. With
+        root=True and no active trace, starts a new trace if sampled (or
+        if force is set).
+        """
+        parent = _current.get()
+        if parent is None:
+            if not root or not (force or random.random() < self.sample_rate):
+                yield None
+                return
+            trace = Trace()
+        else:
+            trace = parent.trace
+        span = Span(trace, name, parent.span_id if parent else None, attributes)
+        trace.spans.append(span)
+        token = _current.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "cancelled" if type(e).__name__ == "CancelledError" else "error"
+            span.attributes.setdefault("error", f"{type(e).__name__}: {e}"[:500])
+            raise
+        finally:
+            span.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            _current.reset(token)
+            if parent is None:
+                self._export(span)
+
+    def _export(self, root: Span):
+        trace = root.trace
+        record = {
+            "trace_id": trace.trace_id,
+            "name": root.name,
+            "start": root.start,
+            "duration_ms": root.duration_ms,
+            "status": root.status,
+            "attributes": root.attributes,
+            "spans": [s.to_dict() for s in trace.spans]
+        }
+        with self._lock:
+            self._traces[trace.trace_id] = record
+            while len(self._traces) > self.buffer_size:
+                self._traces.popitem(last=False)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, default=str) + "\n")
+                except OSError as e:
+                    logger.warning(f"Could not write trace to {self.path}: {e}")
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def recent(self, limit: int = 50, min_duration_ms: float = 0, name: Optional[str] = None) -> List[Dict]:
+        """Newest first, without their spans."""
+        with self._lock:
+            traces = list(reversed(self._traces.values()))
+        matches = [
+            {k: v for k, v in t.items() if k != "spans"} | {"span_count": len(t["spans"])}
+            for t in traces
+            if (t["duration_ms"] or 0) >= min_duration_ms and (name is None or name in t["name"])
+        ]
+        return matches[:limit]
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attributes):
+    return tracer.span(name, **attributes)
+
+
+def set_attributes(**attributes):
+    """Annotate the current span, if tracing."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
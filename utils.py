@@ -1,47 +1,351 @@
 # utils.py
-import ast
+import errno
+import gc
+import logging
+import sys
+import threading
+import time
 import timeit
 import tracemalloc
 import statistics
-import sys
+from contextlib import contextmanager
 from io import StringIO
-from config import BENCHMARK_RUNS, BENCHMARK_ITERATIONS
+from typing import Dict, Optional
+from config import (
+    BENCHMARK_RUNS,
+    BENCHMARK_TARGET_TIME,
+    BENCHMARK_MAX_ITERATIONS,
+    BENCHMARK_WARMUP_CALLS,
+    BENCHMARK_MIN_SIGNAL,
+    BENCHMARK_MEMORY_CALLS,
+    SANDBOX_MAX_OUTPUT_BYTES,
+)
+from scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class _ThreadLocalStream:
+    """
+    Stand-in for sys.stdout/sys.stdin that forwards to a per-thread stream.
+    contextlib.redirect_stdout swaps the process-wide object, which breaks
+    (and can leave stdout captured for good) when benchmarks overlap.
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, "stream", None) or self._default
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __iter__(self):
+        return iter(self._target())
+
+    def __next__(self):
+        return next(self._target())
+
+
+_stream_lock = threading.Lock()
+
+
+def _thread_local_stream(name: str) -> _ThreadLocalStream:
+    with _stream_lock:
+        current = getattr(sys, name)
+        if not isinstance(current, _ThreadLocalStream):
+            current = _ThreadLocalStream(current)
+            setattr(sys, name, current)
+        return current
+
+
+@contextmanager
+def redirect_stream(name: str, stream):
+    """Point sys.<name> ("stdout"/"stdin") at stream for the current thread only."""
+    proxy = _thread_local_stream(name)
+    previous = getattr(proxy._local, "stream", None)
+    proxy._local.stream = stream
+    try:
+        yield stream
+    finally:
+        proxy._local.stream = previous
+
+
+_overflows = threading.local()
+
+
+def output_overflows() -> int:
+    """Counted sinks that overflowed in this thread; the sandbox compares it around each job."""
+    return getattr(_overflows, "count", 0)
+
+
+class OutputSink(StringIO):
+    """
+    Captured program output, keeping at most `limit` characters. Counted
+    sinks that overflow are tallied in output_overflows().
+    """
+
+    def __init__(self, limit: int = None, counted: bool = True):
+        super().__init__()
+        self.limit = SANDBOX_MAX_OUTPUT_BYTES if limit is None else limit
+        self.counted = counted
+        self.total = 0
+
+    def write(self, s):
+        was_truncated = self.truncated
+        self.total += len(s)
+        room = self.limit - self.tell()
+        if room > 0:
+            super().write(s[:room])
+        if self.counted and not was_truncated and self.truncated:
+            _overflows.count = output_overflows() + 1
+        return len(s)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self.limit
+
+
+def capture_stdout(counted: bool = True):
+    """
+    Thread-safe replacement for redirect_stdout(StringIO()), size-capped.
+    Use counted=False around repeated runs (benchmark loops), whose
+    combined output may exceed the limit legitimately.
+    """
+    return redirect_stream("stdout", OutputSink(counted=counted))
+
+
+# Executed exactly like user code so its cost is the harness overhead
+_EMPTY_CODE = compile("pass", "<benchmark>", "exec")
+
+
+def _exec_runner(compiled, fixture=None):
+    """
+    Return a zero-arg callable that executes compiled code in a fresh
+    namespace, with stdin/argv from a WorkloadFixture if one is given.
+    """
+    if fixture is None:
+        def run():
+            exec(compiled, {"__name__": "__main__"})
+    else:
+        def run():
+            namespace = {"__name__": "__main__"}
+            with fixture.activate(namespace):
+                exec(compiled, namespace)
+    return run
 
 
-def robust_benchmark(code: str, runs: int = None, iterations: int = None):
+def calibrate_iterations(fn, target: float = None, max_iterations: int = None) -> int:
+    """
+    Find how many calls of fn fill one sample of roughly `target` seconds
+    (autorange-style, but scaled from the observed rate instead of 1-2-5 steps).
+    """
+    if target is None:
+        target = BENCHMARK_TARGET_TIME
+    if max_iterations is None:
+        max_iterations = BENCHMARK_MAX_ITERATIONS
+
+    timer = timeit.Timer(fn)
+    number = 1
+    while number < max_iterations:
+        elapsed = timer.timeit(number)
+        if elapsed >= target * 0.5:
+            break
+        if elapsed <= 0:
+            number *= 10
+        else:
+            number = int(number * target / elapsed) + 1
+    return max(1, min(number, max_iterations))
+
+
+def measure_overhead(iterations: int, repeat: int = 3, baseline=None) -> float:
+    """
+    Per-call harness cost in seconds. `baseline` is a callable that does
+    everything the measured callable does except the work itself; by default
+    that is exec of an empty module in a fresh namespace.
+    """
+    if baseline is None:
+        baseline = _exec_runner(_EMPTY_CODE)
+    timer = timeit.Timer(baseline)
+    return min(timer.repeat(repeat=repeat, number=iterations)) / iterations
+
+
+def measure_memory(fn, calls: int = None, budget: float = None) -> Dict:
+    """
+    Per-call memory in one traced pass, for up to `calls` calls or until
+    `budget` seconds (default BENCHMARK_TARGET_TIME) are spent, at least one.
+    For each call: the high-water mark of bytes above where it started
+    (peak_bytes_per_call), the bytes still traced when it returns and the
+    net change in allocated blocks (sys.getallocatedblocks). None of these
+    is churn: a temporary allocated and freed over and over within a call
+    shows up at most once in the peak and not at all in the net figures.
+    """
+    if calls is None:
+        calls = BENCHMARK_MEMORY_CALLS
+    if budget is None:
+        budget = BENCHMARK_TARGET_TIME
+    peaks, blocks, retained = [], [], []
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        while True:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            blocks_before = sys.getallocatedblocks()
+            fn()
+            blocks.append(sys.getallocatedblocks() - blocks_before)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+            if len(peaks) >= calls or time.perf_counter() - started >= budget:
+                break
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes_per_call": round(statistics.mean(peaks)),
+        "net_blocks_per_call": round(statistics.mean(blocks), 1),
+        "retained_bytes_per_call": round(statistics.mean(retained)),
+        "peak_bytes": max(peaks),
+        "memory_calls": len(peaks)
+    }
+
+
+def measure_gc_pressure(fn, iterations: int) -> Optional[Dict]:
+    """
+    Run fn with gc enabled and record collections per generation and the
+    time spent collecting, via gc.callbacks. None when gc is held off by
+    another benchmark in this process.
+    """
+    if not gc.isenabled():
+        return None
+    collections = [0, 0, 0]
+    paused = [0.0]
+    started = [0.0]
+
+    def on_gc(phase, info):
+        if phase == "start":
+            started[0] = time.perf_counter()
+        else:
+            collections[info["generation"]] += 1
+            paused[0] += time.perf_counter() - started[0]
+
+    gc.collect()
+    gc.callbacks.append(on_gc)
+    try:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.callbacks.remove(on_gc)
+    return {
+        "iterations": iterations,
+        "collections": {f"gen{g}": n for g, n in enumerate(collections)},
+        "collections_per_1k_iter": round(sum(collections) * 1000 / iterations, 2),
+        "gc_time_ms": round(paused[0] * 1000, 3),
+        "gc_time_pct": round(paused[0] / elapsed * 100, 2) if elapsed > 0 else 0.0
+    }
+
+
+def below_resolution_of(mean_ms: float, stdev_ms: float, overhead_ms: float) -> bool:
+    """
+    True when an overhead-corrected mean is within noise of zero: not above
+    twice the spread of its samples, or below BENCHMARK_MIN_SIGNAL of the
+    harness overhead it was corrected for.
+    """
+    return mean_ms <= 0 or mean_ms <= 2 * stdev_ms or mean_ms < BENCHMARK_MIN_SIGNAL * overhead_ms
+
+
+def speedup_ratio(before: Optional[Dict], after: Optional[Dict]) -> Optional[float]:
+    """Unrounded before/after runtime ratio; None if either side is missing or below resolution."""
+    if not before or not after:
+        return None
+    if before.get("runtime_ms") is None or after.get("runtime_ms") is None:
+        return None
+    return before["runtime_ms"] / after["runtime_ms"]
+
+
+def benchmark_callable(fn, runs: int = None, iterations: int = None, baseline=None):
+    """
+    Time a zero-arg callable.
+
+    The job runs on a dedicated core from the BenchmarkScheduler with gc
+    frozen. After BENCHMARK_WARMUP_CALLS warmup calls, iterations are
+    calibrated to BENCHMARK_TARGET_TIME per sample unless given, and the
+    per-call harness overhead (see measure_overhead) is subtracted from
+    every sample; if what is left is within noise of zero the result has
+    runtime_ms None and below_resolution set. Memory and gc pressure are
+    measured in separate passes (see measure_memory, measure_gc_pressure).
+    Returns None if fn raises.
+    """
     if runs is None:
         runs = BENCHMARK_RUNS
-    if iterations is None:
-        iterations = BENCHMARK_ITERATIONS
-    
-    samples = []
-    mem_samples = []
 
-    for run_num in range(runs):
-        try:
-            old_stdout = sys.stdout
-            sys.stdout = StringIO()
-            tracemalloc.start()
+    try:
+        with capture_stdout(counted=False), get_scheduler().slot() as noise:
+            for _ in range(BENCHMARK_WARMUP_CALLS):
+                # One call at a time, so output over the limit from a single run is reported
+                with capture_stdout():
+                    fn()
+            if iterations is None:
+                iterations = calibrate_iterations(fn)
+            overhead = measure_overhead(iterations, baseline=baseline)
 
-            t = timeit.timeit(lambda: exec(code), number=iterations)
+            timer = timeit.Timer(fn)
+            samples = []
+            for _ in range(runs):
+                t = timer.timeit(number=iterations)
+                samples.append((t / iterations - overhead) * 1000)
 
-            current, peak = tracemalloc.get_traced_memory()
-            tracemalloc.stop()
-            sys.stdout = old_stdout
-
-            samples.append(t * 1000 / iterations)
-            mem_samples.append(peak / (1024 ** 2))
-        except Exception as e:
-            if sys.stdout != old_stdout:
-                sys.stdout = old_stdout
-            if tracemalloc.is_tracing():
-                tracemalloc.stop()
-
-    if not samples:
+            # Memory is measured after the timed samples so tracing doesn't skew them
+            memory = measure_memory(fn)
+        # gc is frozen inside the slot; measure its cost once it is back on
+        with capture_stdout(counted=False):
+            gc_pressure = measure_gc_pressure(fn, iterations)
+    except MemoryError:
+        # Let the sandbox report memory_exceeded instead of a plain failure
+        raise
+    except OSError as e:
+        if e.errno == errno.EFBIG:  # sandbox file-size limit -> output_exceeded
+            raise
+        logger.warning(f"Benchmark failed: {type(e).__name__}: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"Benchmark failed: {type(e).__name__}: {e}")
         return None
 
+    mean = statistics.mean(samples)
+    stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    below_resolution = below_resolution_of(mean, stdev, overhead * 1000)
+    variance_pct = stdev / mean * 100 if not below_resolution else 0.0
+
     return {
-        "runtime_ms": round(statistics.mean(samples), 3),
-        "memory_mb": round(max(mem_samples), 2),
-        "runs": len(samples)
+        # None when the work can't be told apart from harness overhead and noise
+        "runtime_ms": None if below_resolution else round(mean, 6),
+        "below_resolution": below_resolution,
+        "memory_mb": round(memory.pop("peak_bytes") / (1024 ** 2), 2),
+        "runs": len(samples),
+        "iterations": iterations,
+        "overhead_ms": round(overhead * 1000, 6),
+        "variance_pct": round(variance_pct, 2),
+        "samples_ms": [round(s, 6) for s in samples],
+        **memory,
+        "gc": gc_pressure,
+        "noise": noise
     }
+
+
+def robust_benchmark(code: str, runs: int = None, iterations: int = None, fixture=None):
+    try:
+        compiled = compile(code, "<benchmark>", "exec")
+    except SyntaxError:
+        return None
+
+    return benchmark_callable(
+        _exec_runner(compiled, fixture),
+        runs=runs,
+        iterations=iterations,
+        baseline=_exec_runner(_EMPTY_CODE, fixture)
+    )
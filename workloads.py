@@ -0,0 +1,243 @@
+# workloads.py
+import ast
+import hashlib
+import random
+import sys
+from contextlib import contextmanager
+from io import StringIO
+from typing import Dict, List, Optional
+from config import WORKLOAD_DEFAULT_SIZE
+from utils import redirect_stream
+
+_WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+
+
+def _parents(tree) -> Dict[ast.AST, ast.AST]:
+    parents = {}
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            parents[child] = node
+    return parents
+
+
+def _converter(node) -> Optional[str]:
+    """'int'/'float' if node is a call to int() or float()."""
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ("int", "float"):
+        return node.func.id
+    return None
+
+
+def _assigned_name(node, parents: Dict) -> Optional[str]:
+    """Name a value is bound to by a plain `x = <node>` assignment."""
+    parent = parents.get(node)
+    if isinstance(parent, ast.Assign) and len(parent.targets) == 1 and isinstance(parent.targets[0], ast.Name):
+        return parent.targets[0].id
+    return None
+
+
+def _converted_name(tree, name: str) -> Optional[str]:
+    """'int'/'float' if `name` is passed to int()/float() anywhere in tree."""
+    for node in ast.walk(tree):
+        conv = _converter(node)
+        if conv and node.args and isinstance(node.args[0], ast.Name) and node.args[0].id == name:
+            return conv
+    return None
+
+
+def _converted_elements(tree, name: str) -> Optional[str]:
+    """'int'/'float' if a `for x in name:` loop converts x with int()/float()."""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.For) and isinstance(node.iter, ast.Name) and node.iter.id == name \
+                and isinstance(node.target, ast.Name):
+            conv = _converted_name(node, node.target.id)
+            if conv:
+                return conv
+    return None
+
+
+def _classify(call: ast.Call, parents: Dict, tree, prompt: str) -> str:
+    parent = parents.get(call)
+
+    conv = _converter(parent)
+    if conv:
+        return conv
+
+    # input().split() -> list; element type from map(int, ...), [int(x) for ...]
+    # or a later `for x in values: int(x)`
+    if isinstance(parent, ast.Attribute) and parent.attr == "split":
+        split_call = parents.get(parent)
+        outer = parents.get(split_call)
+        if isinstance(outer, ast.Call) and isinstance(outer.func, ast.Name) and outer.func.id == "map":
+            if outer.args and isinstance(outer.args[0], ast.Name) and outer.args[0].id in ("int", "float"):
+                return f"{outer.args[0].id}_list"
+        if isinstance(outer, ast.comprehension):
+            comp = parents.get(outer)
+            conv = _converter(getattr(comp, "elt", None))
+            if conv:
+                return f"{conv}_list"
+        name = _assigned_name(split_call, parents)
+        conv = _converted_elements(tree, name) if name else None
+        if conv:
+            return f"{conv}_list"
+        if "number" in prompt or "values" in prompt:
+            return "int_list"
+        return "words"
+
+    # x = input(...) followed later by int(x)
+    name = _assigned_name(call, parents)
+    conv = _converted_name(tree, name) if name else None
+    if conv:
+        return conv
+    return "text"
+
+
+def infer_stdin_spec(code: str) -> List[Dict]:
+    """
+    One entry per input() call site in source order, with the kind of line
+    it expects and whether it sits in a loop (and so reads repeatedly).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+
+    parents = _parents(tree)
+    spec = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "input"):
+            continue
+        prompt = ""
+        if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+            prompt = node.args[0].value.lower()
+
+        in_loop = False
+        ancestor = parents.get(node)
+        while ancestor is not None:
+            if isinstance(ancestor, (ast.For, ast.While)):
+                in_loop = True
+                break
+            ancestor = parents.get(ancestor)
+
+        spec.append({
+            "kind": _classify(node, parents, tree, prompt),
+            "prompt": prompt,
+            "in_loop": in_loop,
+            "pos": (node.lineno, node.col_offset)
+        })
+
+    spec.sort(key=lambda s: s["pos"])
+    return spec
+
+
+def uses_stdin(code: str) -> bool:
+    return "input(" in code or "sys.stdin" in code
+
+
+def synthesize_line(kind: str, prompt: str, size: int, rng: random.Random) -> str:
+    if kind == "int":
+        # "start of range" style prompts want a small lower bound
+        return "1" if "start" in prompt or "min" in prompt else str(size)
+    if kind == "float":
+        return f"{float(size):.1f}"
+    if kind == "int_list":
+        values = [rng.randint(0, size * 10) for _ in range(size)]
+        if "sorted" in prompt:
+            values.sort()
+        return " ".join(map(str, values))
+    if kind == "float_list":
+        return " ".join(f"{rng.uniform(-50, 150):.2f}" for _ in range(size))
+    if kind == "words" and "pair" in prompt:
+        # e.g. "name-score pairs" -> alpha-42 beta-87
+        sep = "-" if "-" in prompt else ":"
+        return " ".join(f"{rng.choice(_WORDS)}{sep}{rng.randint(0, 100)}" for _ in range(size))
+    return " ".join(rng.choice(_WORDS) for _ in range(size))
+
+
+class WorkloadFixture:
+    """
+    Deterministic stdin/argv for benchmarked programs.
+
+    Every activation replays the same lines, so original and optimized code
+    (and every timed iteration) see identical input. `input` is injected
+    into the exec namespace, sys.stdin is redirected for the current thread
+    and sys.argv is swapped for the duration, so programs never block on
+    the server's real stdin.
+    """
+
+    def __init__(self, stdin_lines: Optional[List[str]] = None, argv: Optional[List[str]] = None):
+        self.stdin_lines = list(stdin_lines or [])
+        self.argv = ["<benchmark>"] + list(argv or [])
+        self._text = "\n".join(self.stdin_lines) + ("\n" if self.stdin_lines else "")
+
+    @classmethod
+    def synthetic(cls, code: str, size: int = None, seed: int = 0,
+                  argv: Optional[List[str]] = None) -> "WorkloadFixture":
+        """Generate stdin matching the input() call sites in code, scaled by size."""
+        if size is None:
+            size = WORKLOAD_DEFAULT_SIZE
+        rng = random.Random(seed)
+        lines = []
+        for site in infer_stdin_spec(code):
+            repeats = size if site["in_loop"] else 1
+            for _ in range(repeats):
+                lines.append(synthesize_line(site["kind"], site["prompt"], size, rng))
+        return cls(stdin_lines=lines, argv=argv)
+
+    @classmethod
+    def from_text(cls, text: str, argv: Optional[List[str]] = None) -> "WorkloadFixture":
+        """User-supplied workload: one stdin line per line of text."""
+        return cls(stdin_lines=text.splitlines(), argv=argv)
+
+    @classmethod
+    def from_file(cls, path: str, argv: Optional[List[str]] = None) -> "WorkloadFixture":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_text(f.read(), argv=argv)
+
+    @contextmanager
+    def activate(self, namespace: Dict):
+        stdin = StringIO(self._text)
+
+        def fake_input(prompt=""):
+            line = stdin.readline()
+            if not line:
+                raise EOFError("EOF when reading a line")
+            return line.rstrip("\n")
+
+        namespace["input"] = fake_input
+        old_argv = sys.argv
+        argv = sys.argv = list(self.argv)
+        try:
+            with redirect_stream("stdin", stdin):
+                yield namespace
+        finally:
+            # argv is process-wide; don't clobber an overlapping run's value
+            if sys.argv is argv:
+                sys.argv = old_argv
+
+    def fingerprint(self) -> Dict:
+        return {
+            "stdin": hashlib.sha256(self._text.encode("utf-8")).hexdigest(),
+            "argv": self.argv
+        }
+
+    def describe(self) -> Dict:
+        return {
+            "stdin_lines": len(self.stdin_lines),
+            "stdin_bytes": len(self._text),
+            "argv": self.argv[1:]
+        }
+
+
+def build_fixture(code: str, stdin: Optional[str] = None, argv: Optional[List[str]] = None,
+                  size: Optional[int] = None, seed: int = 0) -> Optional[WorkloadFixture]:
+    """
+    Fixture for a request: user stdin if given, synthetic stdin if the code
+    reads input, otherwise only argv (or None when nothing is needed).
+    """
+    if stdin is not None:
+        return WorkloadFixture.from_text(stdin, argv=argv)
+    if uses_stdin(code):
+        return WorkloadFixture.synthetic(code, size=size, seed=seed, argv=argv)
+    if argv:
+        return WorkloadFixture(argv=argv)
+    return None